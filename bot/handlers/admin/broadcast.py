@@ -7,6 +7,7 @@ Functional:
 """
 import asyncio
 import logging
+from collections.abc import AsyncIterator
 from aiogram import Router, F, Bot
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
@@ -14,7 +15,7 @@ from aiogram.exceptions import TelegramAPIError, TelegramBadRequest
 
 from database.requests import (
     get_setting, set_setting,
-    get_users_for_broadcast, count_users_for_broadcast,
+    get_broadcast_max_user_id, fetch_broadcast_batch, count_users_for_broadcast,
     mark_user_bot_blocked, set_broadcast_filters_with_revision,
     BroadcastFilterError, normalize_broadcast_filters,
 )
@@ -107,6 +108,19 @@ def get_broadcast_filters() -> tuple[str, ...]:
     )
 
 
+async def iter_broadcast_recipients(filters: tuple[str, ...]) -> AsyncIterator[int]:
+    """Yields recipient telegram ids, reading each batch in a worker thread."""
+    max_id = await asyncio.to_thread(get_broadcast_max_user_id)
+    last_id = 0
+    while True:
+        rows = await asyncio.to_thread(fetch_broadcast_batch, filters, last_id, max_id)
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        for _, telegram_id in rows:
+            yield telegram_id
+
+
 def is_broadcast_in_progress() -> bool:
     """Checks whether the mailing is currently in progress."""
     return get_setting(BROADCAST_IN_PROGRESS_KEY, '0') == '1'
@@ -756,7 +770,7 @@ async def broadcast_confirm(callback: CallbackQuery, bot: Bot):
             show_alert=True,
         )
         return
-    user_ids = get_users_for_broadcast(current_filters)
+    recipient_count = await asyncio.to_thread(count_users_for_broadcast, current_filters)
 
     try:
         current_revision = int(get_setting('broadcast_config_revision', '0') or 0)
@@ -764,7 +778,7 @@ async def broadcast_confirm(callback: CallbackQuery, bot: Bot):
         current_revision = 0
     confirmation_is_current = (
         list(confirmation.get("filters") or []) == list(current_filters)
-        and int(confirmation.get("recipient_count") or 0) == len(user_ids)
+        and int(confirmation.get("recipient_count") or 0) == recipient_count
         and int(confirmation.get("config_revision") or 0) == current_revision
         and str(confirmation.get("material_hash") or "") == broadcast_material_hash(msg_data)
     )
@@ -791,7 +805,7 @@ async def broadcast_confirm(callback: CallbackQuery, bot: Bot):
         await callback.answer("Подтверждение обновлено", show_alert=True)
         return
 
-    if not user_ids:
+    if not recipient_count:
         await callback.answer("❌ Нет получателей!", show_alert=True)
         return
     
@@ -799,7 +813,7 @@ async def broadcast_confirm(callback: CallbackQuery, bot: Bot):
         await callback.answer("⏳ Рассылка уже идёт!", show_alert=True)
         return
     
-    total = len(user_ids)
+    total = recipient_count
     sent = 0
     blocked = 0
     failed = 0
@@ -831,7 +845,7 @@ async def broadcast_confirm(callback: CallbackQuery, bot: Bot):
         await callback.answer()
         callback_answered = True
 
-        for user_id in user_ids:
+        async for user_id in iter_broadcast_recipients(current_filters):
             if is_broadcast_stop_requested():
                 stopped = True
                 break
@@ -17,6 +17,7 @@ from bot.keyboards.admin_users import (
 from database.requests import (
     get_vpn_key_by_id,
     delete_vpn_key,
+    delete_vpn_keys,
     get_user_vpn_keys,
     get_active_servers,
     get_all_servers,
@@ -347,13 +348,11 @@ async def on_sync_db_orphans_confirm(callback: CallbackQuery):
             "SELECT id FROM vpn_keys WHERE server_id IS NULL"
         ).fetchall()
 
-    deleted = 0
-    for row in rows:
-        try:
-            delete_vpn_key(row['id'])
-            deleted += 1
-        except Exception as e:
-            logger.error(f"Очистка БД (orphans): ошибка удаления ключа {row['id']}: {e}")
+    try:
+        deleted = delete_vpn_keys([row['id'] for row in rows])
+    except Exception as e:
+        deleted = 0
+        logger.error(f"Очистка БД (orphans): ошибка удаления ключей: {e}")
 
     await safe_edit_or_send(
         callback.message,
@@ -404,13 +403,11 @@ async def on_sync_db_gone_confirm(callback: CallbackQuery):
             "SELECT id FROM vpn_keys WHERE server_id = ?", (server_id,)
         ).fetchall()
 
-    deleted = 0
-    for row in rows:
-        try:
-            delete_vpn_key(row['id'])
-            deleted += 1
-        except Exception as e:
-            logger.error(f"Очистка БД (gone): ошибка удаления ключа {row['id']}: {e}")
+    try:
+        deleted = delete_vpn_keys([row['id'] for row in rows])
+    except Exception as e:
+        deleted = 0
+        logger.error(f"Очистка БД (gone): ошибка удаления ключей: {e}")
 
     await safe_edit_or_send(
         callback.message,
@@ -511,15 +508,15 @@ async def on_sync_db_missing_confirm(callback: CallbackQuery):
                 (server_id,)
             ).fetchall()
 
-        deleted = 0
-        for row in rows:
-            if row['panel_email'].lower() not in panel_emails:
-                try:
-                    delete_vpn_key(row['id'])
-                    deleted += 1
-                    logger.info(f"Очистка БД: удалён {row['panel_email']} — нет на панели {server['name']}")
-                except Exception as e:
-                    logger.error(f"Очистка БД (missing): ошибка удаления ключа {row['id']}: {e}")
+        missing = [row for row in rows if row['panel_email'].lower() not in panel_emails]
+        try:
+            deleted = delete_vpn_keys([row['id'] for row in missing])
+        except Exception as e:
+            deleted = 0
+            logger.error(f"Очистка БД (missing): ошибка удаления ключей: {e}")
+        else:
+            for row in missing:
+                logger.info(f"Очистка БД: удалён {row['panel_email']} — нет на панели {server['name']}")
 
         await safe_edit_or_send(
             callback.message,
@@ -588,13 +585,11 @@ async def on_sync_db_unreach_confirm(callback: CallbackQuery):
             "SELECT id FROM vpn_keys WHERE server_id = ?", (server_id,)
         ).fetchall()
 
-    deleted = 0
-    for row in rows:
-        try:
-            delete_vpn_key(row['id'])
-            deleted += 1
-        except Exception as e:
-            logger.error(f"Очистка БД (unreach): ошибка удаления ключа {row['id']}: {e}")
+    try:
+        deleted = delete_vpn_keys([row['id'] for row in rows])
+    except Exception as e:
+        deleted = 0
+        logger.error(f"Очистка БД (unreach): ошибка удаления ключей: {e}")
 
     await safe_edit_or_send(
         callback.message,
@@ -244,16 +244,25 @@ async def _collect_server_entry(server: Dict[str, Any]) -> Dict[str, Any]:
     return entry
 
 
+def _collect_db_stats() -> tuple:
+    """Reads the aggregate counters of the snapshot in one worker thread."""
+    return (
+        get_users_stats(),
+        get_keys_stats(),
+        get_daily_payments_stats(),
+        len(get_expiring_keys(1)),
+        get_new_users_count_today(),
+    )
+
+
 async def collect_admin_monitoring_snapshot() -> Dict[str, Any]:
     """Collects a common snapshot for the main admin panel and the servers section."""
     servers = get_all_servers()
     entries = await asyncio.gather(*[_collect_server_entry(server) for server in servers]) if servers else []
 
-    users = get_users_stats()
-    keys = get_keys_stats()
-    payments = get_daily_payments_stats()
-    expiring_24h = len(get_expiring_keys(1))
-    new_users = get_new_users_count_today()
+    users, keys, payments, expiring_24h, new_users = await asyncio.to_thread(
+        _collect_db_stats
+    )
 
     problems: List[Dict[str, Any]] = []
     for entry in entries:
@@ -11,8 +11,6 @@ import logging
 import uuid
 import base64
 import aiohttp
-import qrcode
-import io
 import math
 import asyncio
 from collections import defaultdict
@@ -20,6 +18,7 @@ from decimal import Decimal, ROUND_HALF_UP
 from typing import Optional, Dict, Any, Tuple
 
 from bot.utils.billing_values import resolve_duration_days
+from bot.utils.key_generator import generate_qr_code
 
 from database.requests import (
     find_order_by_order_id, complete_order, is_order_already_paid,
@@ -327,7 +326,7 @@ async def _process_payment_order_unlocked(
     """
     from database.requests import (
         is_order_already_paid, find_order_by_order_id, complete_order, 
-        create_initial_vpn_key, reopen_paid_order, update_payment_key_id
+        create_order_draft_key, reopen_paid_order
     )
     
     # 1. Order search and v1 intent dispatch.
@@ -450,9 +449,10 @@ async def _process_payment_order_unlocked(
             from database.requests import get_tariff_by_id as _get_tariff
             _tariff = _get_tariff(order['tariff_id'])
             traffic_limit_bytes = (_tariff.get('traffic_limit_gb', 0) or 0) * (1024**3) if _tariff else 0
-            key_id = create_initial_vpn_key(order['user_id'], order['tariff_id'], days, traffic_limit=traffic_limit_bytes)
-            
-            update_payment_key_id(order_id, key_id)
+            key_id = create_order_draft_key(
+                order_id, order['user_id'], order['tariff_id'], days,
+                traffic_limit=traffic_limit_bytes,
+            )
             order['vpn_key_id'] = key_id
             try:
                 from bot.services.key_lifecycle import emit_key_lifecycle_event_safe
@@ -742,18 +742,7 @@ async def create_yookassa_qr_payment(
             'ЮКасса API не вернул id или confirmation_url',
         )
 
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(qr_url)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    bio = io.BytesIO()
-    img.save(bio, format="PNG")
-    qr_image_data = bio.getvalue()
+    qr_image_data = await asyncio.to_thread(generate_qr_code, qr_url)
 
     logger.info(
         "ЮКасса QR создан: payment_id=%s, order_id=%s, amount=%s RUB",
@@ -904,18 +893,7 @@ async def create_wata_payment(
             'WATA API не вернул id или URL платёжной ссылки',
         )
 
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(qr_url)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    bio = io.BytesIO()
-    img.save(bio, format="PNG")
-    qr_image_data = bio.getvalue()
+    qr_image_data = await asyncio.to_thread(generate_qr_code, qr_url)
     logger.info(
         "WATA ссылка создана: link_id=%s, order_id=%s, amount=%s RUB",
         wata_link_id,
@@ -1086,18 +1064,7 @@ async def create_platega_payment(
             'Platega API не вернул id или URL платёжной ссылки',
         )
 
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(qr_url)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    bio = io.BytesIO()
-    img.save(bio, format="PNG")
-    qr_image_data = bio.getvalue()
+    qr_image_data = await asyncio.to_thread(generate_qr_code, qr_url)
     logger.info(
         "Platega транзакция создана: id=%s, order_id=%s, amount=%s RUB",
         transaction_id,
@@ -1272,18 +1239,7 @@ async def create_cardlink_payment(
             'Cardlink API не вернул bill_id или URL',
         )
 
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(qr_url)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    bio = io.BytesIO()
-    img.save(bio, format="PNG")
-    qr_image_data = bio.getvalue()
+    qr_image_data = await asyncio.to_thread(generate_qr_code, qr_url)
     logger.info(
         "Cardlink счёт создан: bill_id=%s, order_id=%s, amount=%s RUB",
         bill_id,
@@ -26,7 +26,7 @@ from config import ADMIN_IDS, GITHUB_REPO_URL
 from database.requests import (
     get_all_servers, get_users_stats, get_keys_stats,
     get_daily_payments_stats, get_new_users_count_today,
-    get_setting, get_expiring_keys, is_notification_sent_today, log_notification_sent,
+    get_setting, get_expiring_keys_needing_notification, log_notifications_sent_bulk,
     is_update_notifications_enabled, mark_user_bot_blocked
 )
 from database.db_backup import backup_bot_database_to
@@ -65,6 +65,9 @@ CUSTOM_EXTENSIONS_BACKUP_DIRNAME = 'custom_extensions'
 # How many days to store local backups
 BACKUP_RETENTION_DAYS = 7
 
+# How many sent expiry notifications to record per notification_log commit
+NOTIFICATION_LOG_BATCH_SIZE = 50
+
 _CUSTOM_EXTENSION_CACHE_DIRS = {'__pycache__'}
 _CUSTOM_EXTENSION_CACHE_SUFFIXES = ('.pyc', '.pyo')
 
@@ -299,15 +302,11 @@ async def collect_daily_stats() -> str:
     Returns:
         Rich text statistics
     """
-    # User statistics
-    users = get_users_stats()
-    new_users = get_new_users_count_today()
-    
-    # Key statistics
-    keys = get_keys_stats()
-    
-    # Payment statistics
-    payments = get_daily_payments_stats()
+    # Aggregate queries scan whole tables, so they run off the event loop
+    users = await asyncio.to_thread(get_users_stats)
+    new_users = await asyncio.to_thread(get_new_users_count_today)
+    keys = await asyncio.to_thread(get_keys_stats)
+    payments = await asyncio.to_thread(get_daily_payments_stats)
     
     # Server statistics
     servers = get_all_servers()
@@ -697,6 +696,16 @@ async def send_backup_archive(bot: Bot) -> None:
         logger.error(f"Ошибка при отправке бэкапа: {e}")
 
 
+async def _flush_notification_log(key_ids: list[int]) -> bool:
+    """Records sent expiry notifications; returns False if the write failed."""
+    try:
+        await asyncio.to_thread(log_notifications_sent_bulk, key_ids)
+    except Exception as e:
+        logger.error(f"Не удалось записать {len(key_ids)} отправленных уведомлений в notification_log: {e}")
+        return False
+    return True
+
+
 async def check_and_send_expiry_notifications(bot: Bot) -> None:
     """
     Checks and sends notifications about expiring keys.
@@ -719,68 +728,79 @@ async def check_and_send_expiry_notifications(bot: Bot) -> None:
         notification_media = notification_data.get('media_file_id')
         notification_media_type = notification_data.get('media_type')
         
-        expiring_keys = get_expiring_keys(days)
+        expiring_keys = await asyncio.to_thread(get_expiring_keys_needing_notification, days)
         sent_count = 0
+        # Sent keys are written to notification_log in small batches: one
+        # commit per batch, while a restart re-sends at most one batch.
+        unlogged_key_ids: list[int] = []
         
-        for key_info in expiring_keys:
-            vpn_key_id = key_info['vpn_key_id']
-            user_telegram_id = key_info['user_telegram_id']
-            days_left = key_info['days_left']
-            keyname = key_info.get('custom_name') or f"#{vpn_key_id}"
-            
-            # Checking if we sent today
-            if is_notification_sent_today(vpn_key_id):
-                continue
-            
-            event_context = build_user_event_context(user_telegram_id)
-            event_context.update({
-                'key_name': keyname,
-                'key_days_left': days_left,
-            })
-            text = render_event_placeholders(
-                notification_text,
-                'key_expiring',
-                event_context,
-                mode='html',
-            )
+        try:
+            for key_info in expiring_keys:
+                vpn_key_id = key_info['vpn_key_id']
+                user_telegram_id = key_info['user_telegram_id']
+                days_left = key_info['days_left']
+                keyname = key_info.get('custom_name') or f"#{vpn_key_id}"
             
-            prepared_actions = await prepare_page_render(
-                bot,
-                'expiry_notification_actions',
-                context={
-                    'telegram_id': user_telegram_id,
-                    'key_id': vpn_key_id,
+                event_context = build_user_event_context(user_telegram_id)
+                event_context.update({
                     'key_name': keyname,
                     'key_days_left': days_left,
-                },
-            )
-            kb = (
-                prepared_actions.reply_markup
-                if isinstance(prepared_actions, PreparedPageRender)
-                and prepared_actions.page_key == 'expiry_notification_actions'
-                else None
-            )
+                })
+                text = render_event_placeholders(
+                    notification_text,
+                    'key_expiring',
+                    event_context,
+                    mode='html',
+                )
             
-            try:
-                await send_media_or_text(
+                prepared_actions = await prepare_page_render(
                     bot,
-                    chat_id=user_telegram_id,
-                    text=text,
-                    media=notification_media,
-                    media_type=notification_media_type,
-                    reply_markup=kb,
+                    'expiry_notification_actions',
+                    context={
+                        'telegram_id': user_telegram_id,
+                        'key_id': vpn_key_id,
+                        'key_name': keyname,
+                        'key_days_left': days_left,
+                    },
                 )
-                log_notification_sent(vpn_key_id)
-                sent_count += 1
-            except Exception as e:
-                if is_bot_blocked_error(e):
-                    mark_user_bot_blocked(user_telegram_id)
-                    logger.info(f"Пользователь {user_telegram_id} помечен как заблокировавший бота")
+                kb = (
+                    prepared_actions.reply_markup
+                    if isinstance(prepared_actions, PreparedPageRender)
+                    and prepared_actions.page_key == 'expiry_notification_actions'
+                    else None
+                )
+            
+                try:
+                    await send_media_or_text(
+                        bot,
+                        chat_id=user_telegram_id,
+                        text=text,
+                        media=notification_media,
+                        media_type=notification_media_type,
+                        reply_markup=kb,
+                    )
+                except Exception as e:
+                    if is_bot_blocked_error(e):
+                        mark_user_bot_blocked(user_telegram_id)
+                        logger.info(f"Пользователь {user_telegram_id} помечен как заблокировавший бота")
+                    else:
+                        logger.warning(f"Не удалось отправить уведомление пользователю {user_telegram_id}: {e}")
                 else:
-                    logger.warning(f"Не удалось отправить уведомление пользователю {user_telegram_id}: {e}")
+                    unlogged_key_ids.append(vpn_key_id)
+                    sent_count += 1
+
+                # A failed write keeps the ids and retries them with the next flush.
+                if (
+                    len(unlogged_key_ids) >= NOTIFICATION_LOG_BATCH_SIZE
+                    and await _flush_notification_log(unlogged_key_ids)
+                ):
+                    unlogged_key_ids = []
             
-            # Slight delay between messages
-            await asyncio.sleep(0.3)
+                # Slight delay between messages
+                await asyncio.sleep(0.3)
+        finally:
+            if unlogged_key_ids:
+                await _flush_notification_log(unlogged_key_ids)
         
         if sent_count > 0:
             logger.info(f"📬 Отправлено {sent_count} уведомлений об истечении ключей")
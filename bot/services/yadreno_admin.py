@@ -43,6 +43,9 @@ from database.requests import (
     get_yadreno_admin_api_key,
     get_yadreno_admin_last_request_id,
     get_yadreno_admin_server_ip,
+    invalidate_servers_cache,
+    invalidate_settings_cache,
+    invalidate_tariffs_cache,
     is_yadreno_admin_core_changes_enabled,
     list_yadreno_admin_active_requests,
     list_yadreno_admin_tool_runtime,
@@ -1578,7 +1581,13 @@ async def _execute_sqlite(
             audit["tables"] = sorted(touched_tables)[:20]
             return {"result": "", "error": str(e), "_audit": audit}
 
-    return await asyncio.to_thread(_run)
+    result = await asyncio.to_thread(_run)
+    # Direct SQL bypasses set_setting, so in-process caches must be reloaded.
+    if {"insert", "update", "delete"} & set(result["_audit"]["actions"]):
+        invalidate_settings_cache()
+        invalidate_servers_cache()
+        invalidate_tariffs_cache()
+    return result
 
 
 async def _execute_sql_cli(
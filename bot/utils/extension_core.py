@@ -47,7 +47,7 @@ class ExtensionCoreAPI:
             'tariff_name',
         }
         return [
-            {key: value for key, value in dict(item).items() if key in allowed}
+            {key: value for key, value in item.items() if key in allowed}
             for item in get_user_keys_for_display(telegram_id)
         ]
 
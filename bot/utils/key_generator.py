@@ -7,7 +7,8 @@ import base64
 import urllib.parse
 import io
 import logging
-import qrcode
+import orjson
+import segno
 from typing import Dict, Any
 
 logger = logging.getLogger(__name__)
@@ -35,7 +36,7 @@ def generate_link(config: Dict[str, Any]) -> str:
     return gen(config)
 
 
-def generate_json(config: Dict[str, Any]) -> str:
+def generate_json(config: Dict[str, Any]) -> bytes:
     """
     Generates JSON configuration for Xray/V2Ray clients.
     Supports: vless, vmess, trojan, shadowsocks.
@@ -240,7 +241,7 @@ def generate_vless_link(config: Dict[str, Any]) -> str:
     return link
 
 
-def generate_vless_json(config: Dict[str, Any]) -> str:
+def generate_vless_json(config: Dict[str, Any]) -> bytes:
     """Generates JSON configuration for VLESS."""
     stream = config.get('stream_settings', {})
     network = stream.get('network', 'tcp')
@@ -354,7 +355,7 @@ def generate_vmess_link(config: Dict[str, Any]) -> str:
     return "vmess://" + base64.b64encode(json_str.encode()).decode()
 
 
-def generate_vmess_json(config: Dict[str, Any]) -> str:
+def generate_vmess_json(config: Dict[str, Any]) -> bytes:
     """Generates JSON configuration for VMess."""
     stream = config.get('stream_settings', {})
     
@@ -402,7 +403,7 @@ def generate_trojan_link(config: Dict[str, Any]) -> str:
     return f"trojan://{password}@{host}:{port}?{query}#{name}"
 
 
-def generate_trojan_json(config: Dict[str, Any]) -> str:
+def generate_trojan_json(config: Dict[str, Any]) -> bytes:
     """Generates JSON configuration for Trojan."""
     stream = config.get('stream_settings', {})
     password = config.get('password', config.get('uuid', ''))
@@ -463,7 +464,7 @@ def generate_shadowsocks_link(config: Dict[str, Any]) -> str:
         return f"ss://{user_info}@{host}:{port}#{name}"
 
 
-def generate_shadowsocks_json(config: Dict[str, Any]) -> str:
+def generate_shadowsocks_json(config: Dict[str, Any]) -> bytes:
     """Generates JSON configuration for Shadowsocks."""
     stream = config.get('stream_settings', {})
     
@@ -520,8 +521,8 @@ def _build_stream_settings(stream: dict) -> dict:
     return result
 
 
-def _wrap_outbound(outbound: dict) -> str:
-    """Wraps outbound in the full Xray client config."""
+def _wrap_outbound(outbound: dict) -> bytes:
+    """Wraps outbound in the full Xray client config, serialized as UTF-8 JSON."""
     final_config = {
         "log": {"loglevel": "warning"},
         "inbounds": [{
@@ -543,7 +544,8 @@ def _wrap_outbound(outbound: dict) -> str:
             }]
         }
     }
-    return json.dumps(final_config, indent=2, ensure_ascii=False)
+    # Compact output: clients parse it anyway and the file is uploaded on every send.
+    return orjson.dumps(final_config)
 
 
 # ============================================================================
@@ -560,19 +562,7 @@ def generate_qr_code(data: str) -> bytes:
     Returns:
         Image bytes (PNG)
     """
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(data)
-    qr.make(fit=True)
-
-    img = qr.make_image(fill_color="black", back_color="white")
-    
-    img_byte_arr = io.BytesIO()
-    img.save(img_byte_arr, format='PNG')
-    img_byte_arr.seek(0)
-    
-    return img_byte_arr.getvalue()
+    # segno writes PNG scanlines directly, without a Pillow image round-trip.
+    buffer = io.BytesIO()
+    segno.make_qr(data, error='L', boost_error=False).save(buffer, kind='png', scale=10, border=4)
+    return buffer.getvalue()
@@ -1,6 +1,7 @@
 """
 A utility for sending VPN keys to the user.
 """
+import asyncio
 import logging
 from types import SimpleNamespace
 from typing import Mapping, Optional
@@ -120,6 +121,8 @@ def _get_target_message(messageable) -> Optional[Message]:
     """Returns the message to be edited via safe_edit_or_send."""
     if isinstance(messageable, Message):
         return messageable
+    if isinstance(messageable, CallbackQuery):
+        return messageable.message
     nested_message = getattr(messageable, 'message', None)
     if nested_message is not None:
         return nested_message
@@ -176,6 +179,9 @@ def build_key_delivery_target(source, message: Optional[Message]):
 
 def _get_viewer_id(messageable) -> Optional[int]:
     """Returns the Telegram ID of the user who sees the page."""
+    if isinstance(messageable, CallbackQuery):
+        # Callback queries always come from the person who pressed the button.
+        return messageable.from_user.id
     user = getattr(messageable, 'from_user', None)
     if user and not getattr(user, 'is_bot', False):
         return user.id
@@ -255,79 +261,6 @@ def _get_json_document_markup(
     )
 
 
-def _build_key_delivery_caption(
-    raw_value: str,
-    is_new: bool,
-    kind: str,
-    viewer_id: Optional[int] = None,
-    bot_username: str = '',
-    key_fields: Optional[Mapping[str, object]] = None,
-    order_id: str | None = None,
-) -> str:
-    """Collects caption for issuing a key/subscription taking into account the Telegram limit."""
-    from bot.utils.page_renderer import render_page_text
-
-    context = {}
-    if viewer_id:
-        context['telegram_id'] = viewer_id
-    if bot_username:
-        context['bot_username'] = bot_username
-    context = _add_key_fields(context, key_fields)
-    context = _add_payment_order(context, order_id)
-    caption = render_page_text(
-        KEY_DELIVERY_PAGE,
-        context=context,
-        text_replacements=build_key_delivery_replacements(raw_value),
-    )
-    if caption is None:
-        raise RuntimeError(f"Missing required page: {KEY_DELIVERY_PAGE}")
-
-    if len(caption) <= 1024:
-        return caption
-    compact = render_page_text(
-        'key_delivery_partial',
-        context=context,
-        text_replacements=build_key_delivery_replacements(raw_value),
-    )
-    if compact is None or len(compact) > 1024:
-        raise RuntimeError("key_delivery_partial must fit Telegram's caption limit")
-    return compact
-
-
-async def _render_key_delivery_photo(
-    target_message: Message,
-    raw_value: str,
-    reply_markup: Optional[InlineKeyboardMarkup],
-    is_new: bool,
-    kind: str,
-    viewer_id: Optional[int] = None,
-    bot_username: str = '',
-    key_fields: Optional[Mapping[str, object]] = None,
-    order_id: str | None = None,
-) -> Optional[Message]:
-    """Sends or edits a QR photo of the key issuance page."""
-    from bot.utils.text import safe_edit_or_send
-
-    caption = _build_key_delivery_caption(
-        raw_value,
-        is_new,
-        kind,
-        viewer_id=viewer_id,
-        bot_username=bot_username,
-        key_fields=key_fields,
-        order_id=order_id,
-    )
-    filename = "subscription_qr.png" if kind == 'subscription' else "qrcode.png"
-    photo = BufferedInputFile(generate_qr_code(raw_value), filename=filename)
-
-    return await safe_edit_or_send(
-        target_message,
-        caption,
-        reply_markup=reply_markup,
-        photo=photo,
-    )
-
-
 def _remember_key_delivery_context(
     viewer_id: Optional[int],
     rendered_message: Message,
@@ -426,7 +359,10 @@ async def _prepare_key_delivery_page(
         prepared.text = compact
 
     filename = 'subscription_qr.png' if kind == 'subscription' else 'qrcode.png'
-    prepared.media = BufferedInputFile(generate_qr_code(raw_value), filename=filename)
+    prepared.media = BufferedInputFile(
+        await asyncio.to_thread(generate_qr_code, raw_value),
+        filename=filename,
+    )
     prepared.media_type = 'photo'
     return prepared
 
@@ -643,7 +579,7 @@ async def send_key_with_qr(
             return
 
         # 4. Send JSON config file
-        config_file = BufferedInputFile(json_config.encode('utf-8'), filename=f"vpn_config_{key_data.get('id', 'new')}.json")
+        config_file = BufferedInputFile(json_config, filename=f"vpn_config_{key_data.get('id', 'new')}.json")
 
         # Send the file and keyboard as a separate message
         target_message = _get_target_message(messageable)
@@ -243,25 +243,19 @@ def _format_user_display_name(user: dict[str, Any]) -> str:
     return f"ID {user.get('telegram_id')}"
 
 
-def _count_active_keys(keys: list[dict[str, Any]]) -> int:
-    return sum(1 for key in keys if bool(key.get('is_active')))
-
-
 def build_user_profile_context_values(telegram_id: int | None) -> dict[str, Any]:
     """Returns context values of profile widgets placeholders."""
     telegram_id = _optional_int(telegram_id)
     if not telegram_id:
         return {}
 
-    from database.requests import get_user_balance, get_user_by_telegram_id, get_user_keys_for_display
+    from database.requests import get_user_balance, get_user_by_telegram_id, get_user_key_counts
 
     user = get_user_by_telegram_id(telegram_id)
     if not user:
         return {}
 
-    keys = get_user_keys_for_display(telegram_id)
-    total_keys = len(keys)
-    active_keys = _count_active_keys(keys)
+    total_keys, active_keys = get_user_key_counts(telegram_id)
     expired_keys = max(total_keys - active_keys, 0)
     balance_cents = get_user_balance(int(user['id']))
     balance_text = format_price_compact(balance_cents)
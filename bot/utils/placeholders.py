@@ -594,6 +594,11 @@ def apply_page_placeholders(
     if text is None:
         return ''
 
+    text = str(text)
+    if '%' not in text:
+        # Page bodies are stored as ready HTML; only placeholders need work.
+        return text
+
     normalized_replacements = _normalize_replacements(replacements)
     runtime_context = _normalize_context(context)
 
@@ -609,4 +614,4 @@ def apply_page_placeholders(
             )
         return _resolve_registered_placeholder(placeholder, runtime_context, mode)
 
-    return _PLACEHOLDER_RE.sub(replace_match, str(text))
+    return _PLACEHOLDER_RE.sub(replace_match, text)
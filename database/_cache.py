@@ -0,0 +1,56 @@
+"""
+In-process copies of small tables that are read often and written rarely.
+
+Settings, servers and tariffs are loaded whole on the first read and served
+from memory until a writer invalidates them.
+"""
+import threading
+from functools import wraps
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class TableCache(Generic[T]):
+    """
+    Lazily loaded snapshot of one table, guarded by a generation counter.
+
+    Every writer of the table must call invalidate() after its transaction
+    commits (or be wrapped with invalidates()).
+    """
+
+    def __init__(self, loader: Callable[[], T]):
+        self._loader = loader
+        self._value: Optional[T] = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        """Returns the cached snapshot, loading the table on a miss."""
+        value = self._value
+        if value is not None:
+            return value
+        generation = self._generation
+        loaded = self._loader()
+        with self._lock:
+            # A write committed while we were reading: serve this snapshot to
+            # the current caller only and let the next read load again.
+            if generation == self._generation:
+                self._value = loaded
+        return loaded
+
+    def invalidate(self) -> None:
+        """Drops the snapshot so the next read reloads the table."""
+        with self._lock:
+            self._value = None
+            self._generation += 1
+
+    def invalidates(self, func):
+        """Decorates a function that writes the cached table."""
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.invalidate()
+        return wrapper
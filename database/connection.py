@@ -2,9 +2,15 @@
 SQLite database connection module.
 
 Provides a context manager for secure work with the database.
+Connections are kept in a small per-file pool so hot read paths do not pay
+for sqlite3.connect and PRAGMA setup on every call.
 """
+import datetime
+import queue
 import sqlite3
+import threading
 from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
@@ -24,12 +30,49 @@ DEFAULT_SQLITE_BUSY_TIMEOUT_MS = 10000
 DEFAULT_SQLITE_CACHE_SIZE_KB = 32768
 DEFAULT_SQLITE_TEMP_STORE = "MEMORY"
 DEFAULT_SQLITE_MMAP_SIZE_BYTES = 134217728
+DEFAULT_SQLITE_POOL_SIZE = 8
+DEFAULT_SQLITE_CACHED_STATEMENTS = 512
 
 _ALLOWED_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
 _ALLOWED_SYNCHRONOUS = {"OFF", "NORMAL", "FULL", "EXTRA"}
 _ALLOWED_TEMP_STORE = {"DEFAULT", "FILE", "MEMORY"}
 
 
+class _ConnectionPool(queue.LifoQueue):
+    """
+    Idle connections of one database file.
+
+    LIFO hands out the most recently used connection, whose page and
+    statement caches are still warm; idle extras stay cold. Once closed, the
+    pool closes every connection released into it instead of keeping it.
+    """
+
+    def __init__(self, maxsize: int):
+        super().__init__(maxsize)
+        self.closed = False
+
+    def _put(self, conn: sqlite3.Connection) -> None:
+        # Called with self.mutex held, so it cannot interleave with close().
+        if self.closed:
+            conn.close()
+        else:
+            super()._put(conn)
+
+    def close(self) -> int:
+        """Closes the idle connections and marks the pool as closed."""
+        with self.mutex:
+            self.closed = True
+            idle = list(self.queue)
+            self.queue.clear()
+        for conn in idle:
+            conn.close()
+        return len(idle)
+
+
+_pools: dict[str, _ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
 def _config_value(name: str, default: Any) -> Any:
     if config is None:
         return default
@@ -99,6 +142,22 @@ def _apply_connection_pragmas(conn: sqlite3.Connection) -> None:
     conn.execute("PRAGMA foreign_keys = ON")
 
 
+def get_sqlite_pool_size() -> int:
+    """Returns how many idle connections are kept per database file."""
+    return _int_config(
+        "SQLITE_POOL_SIZE",
+        DEFAULT_SQLITE_POOL_SIZE,
+    )
+
+
+def get_sqlite_cached_statements() -> int:
+    """Returns the size of the per-connection prepared statement cache."""
+    return _int_config(
+        "SQLITE_CACHED_STATEMENTS",
+        DEFAULT_SQLITE_CACHED_STATEMENTS,
+    )
+
+
 def get_connection() -> sqlite3.Connection:
     """
     Creates a new connection to the database.
@@ -107,18 +166,137 @@ def get_connection() -> sqlite3.Connection:
         sqlite3.Connection: Connection to the database
     """
     timeout_seconds = get_sqlite_busy_timeout_ms() / 1000
-    conn = sqlite3.connect(DB_PATH, timeout=timeout_seconds)
+    conn = sqlite3.connect(
+        DB_PATH,
+        timeout=timeout_seconds,
+        check_same_thread=False,  # Pooled connections move between to_thread workers
+        cached_statements=get_sqlite_cached_statements(),
+    )
     conn.row_factory = sqlite3.Row  # Access fields by name
     _apply_connection_pragmas(conn)
     return conn
 
 
+def fetchall_dicts(cursor: sqlite3.Cursor) -> list[dict[str, Any]]:
+    """
+    Fetches the remaining rows of a query as plain dicts.
+
+    Skips the intermediate sqlite3.Row per row that `dict(row)` would need.
+    """
+    columns = [column[0] for column in cursor.description]
+    cursor.row_factory = None
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def fetchall_column(cursor: sqlite3.Cursor) -> list[Any]:
+    """
+    Fetches the first column of the remaining rows as a flat list.
+
+    Reads plain tuples, so no sqlite3.Row is built just to index column 0.
+    """
+    cursor.row_factory = None
+    return [row[0] for row in cursor.fetchall()]
+
+
+def utc_now() -> datetime.datetime:
+    """Current UTC time as stored by SQLite's CURRENT_TIMESTAMP (naive, whole seconds)."""
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None, microsecond=0)
+
+
+def sqlite_utc_text(moment: datetime.datetime | None = None) -> str:
+    """
+    Formats a naive UTC time (default: now) as SQLite timestamp text.
+
+    Same 'YYYY-MM-DD HH:MM:SS' form that datetime('now', ...) and
+    CURRENT_TIMESTAMP produce, so bound values compare correctly with them.
+    """
+    if moment is None:
+        moment = utc_now()
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+
+@lru_cache(maxsize=128)
+def update_by_id_sql(table: str, columns: tuple[str, ...]) -> str:
+    """
+    Builds `UPDATE table SET ... WHERE id = ?` for a sorted column tuple.
+
+    Cached so one column set always yields the same SQL text, which keeps
+    the per-connection statement cache hitting. Only pass trusted,
+    whitelisted table and column names.
+    """
+    set_clause = ", ".join(f"{column} = ?" for column in columns)
+    return f"UPDATE {table} SET {set_clause} WHERE id = ?"
+
+
+def _get_pool(readonly: bool = False) -> _ConnectionPool:
+    """Returns the idle connection pool of the current DB_PATH."""
+    # DB_PATH is swapped at runtime (reset backups, migration candidates),
+    # so every file gets its own pool.
+    key = ("ro:" if readonly else "rw:") + str(DB_PATH)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _ConnectionPool(maxsize=get_sqlite_pool_size())
+                _pools[key] = pool
+    return pool
+
+
+def _acquire_connection(
+    pool: _ConnectionPool,
+    readonly: bool = False,
+) -> sqlite3.Connection:
+    """Takes an idle connection or opens a new one if the pool is empty."""
+    try:
+        return pool.get_nowait()
+    except queue.Empty:
+        conn = get_connection()
+        if readonly:
+            conn.execute("PRAGMA query_only = ON")
+        return conn
+
+
+def _release_connection(
+    pool: _ConnectionPool,
+    conn: sqlite3.Connection,
+) -> None:
+    """Returns a clean connection to the pool, closing it otherwise."""
+    if conn.in_transaction:
+        # The block was interrupted without commit/rollback: closing the
+        # connection discards the transaction exactly like before pooling.
+        conn.close()
+        return
+    conn.row_factory = sqlite3.Row
+    try:
+        pool.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+
+def close_db_pool() -> int:
+    """
+    Closes all idle pooled connections.
+
+    Connections checked out at this moment are closed when they are
+    released, since their pool is marked closed.
+
+    Returns:
+        int: Number of closed idle connections
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    return sum(pool.close() for pool in pools)
+
+
 @contextmanager
 def get_db():
     """
     Context manager for working with the database.
     
     Automatically commits on success and rollback on error.
+    The connection is borrowed from the pool and returned on exit.
     
     Example:
         with get_db() as conn:
@@ -128,7 +306,8 @@ def get_db():
     Yields:
         sqlite3.Connection: Connection to the database
     """
-    conn = get_connection()
+    pool = _get_pool()
+    conn = _acquire_connection(pool)
     try:
         yield conn
         conn.commit()
@@ -136,4 +315,44 @@ def get_db():
         conn.rollback()
         raise
     finally:
-        conn.close()
+        _release_connection(pool, conn)
+
+
+@contextmanager
+def get_db_tx():
+    """
+    Context manager for a write transaction that takes the lock up front.
+
+    Same as get_db(), but opens the transaction with BEGIN IMMEDIATE, so
+    read-then-write sequences cannot fail halfway on a lock upgrade and
+    several helpers can share one commit.
+
+    Yields:
+        sqlite3.Connection: Connection inside an open write transaction
+    """
+    with get_db() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        yield conn
+
+
+@contextmanager
+def get_db_read():
+    """
+    Context manager for read-only queries.
+
+    Connections come from a separate pool opened with PRAGMA query_only, so
+    heavy admin reads (stats, pagination, broadcast selection) run on their
+    own WAL snapshots and never hold a connection that writers are waiting for.
+    Any attempt to write raises sqlite3.OperationalError.
+
+    Yields:
+        sqlite3.Connection: Read-only connection to the database
+    """
+    pool = _get_pool(readonly=True)
+    conn = _acquire_connection(pool, readonly=True)
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        _release_connection(pool, conn)
@@ -5,7 +5,8 @@ from __future__ import annotations
 import json
 from typing import Any, Optional
 
-from .connection import get_db
+from .connection import get_db, get_db_tx
+from .db_settings import invalidates_settings_cache
 from .db_stats import encode_broadcast_filters
 
 __all__ = [
@@ -104,6 +105,7 @@ def get_broadcast_editor_snapshot(telegram_id: int) -> dict[str, Optional[str]]:
     }
 
 
+@invalidates_settings_cache
 def insert_broadcast_stage_if_absent(telegram_id: int, raw_stage: str) -> bool:
     """Insert a newly built stage without replacing a concurrent creator."""
     with get_db() as conn:
@@ -114,14 +116,14 @@ def insert_broadcast_stage_if_absent(telegram_id: int, raw_stage: str) -> bool:
         return cursor.rowcount > 0
 
 
+@invalidates_settings_cache
 def compare_and_swap_broadcast_stage(
     telegram_id: int,
     expected_stage_revision: int,
     raw_stage: str,
 ) -> tuple[bool, Optional[str]]:
     """Replace a stage only when its embedded revision matches the caller."""
-    with get_db() as conn:
-        conn.execute("BEGIN IMMEDIATE")
+    with get_db_tx() as conn:
         current_raw = _read_setting(conn, _stage_key(telegram_id))
         if _stage_revision(current_raw) != int(expected_stage_revision):
             return False, current_raw
@@ -129,6 +131,7 @@ def compare_and_swap_broadcast_stage(
         return True, raw_stage
 
 
+@invalidates_settings_cache
 def delete_broadcast_editor_stage(telegram_id: int) -> bool:
     """Delete the durable editor stage for one administrator."""
     with get_db() as conn:
@@ -139,9 +142,9 @@ def delete_broadcast_editor_stage(telegram_id: int) -> bool:
         return cursor.rowcount > 0
 
 
+@invalidates_settings_cache
 def _set_working_value_with_revision(key: str, value: str) -> int:
-    with get_db() as conn:
-        conn.execute("BEGIN IMMEDIATE")
+    with get_db_tx() as conn:
         revision = _safe_revision(_read_setting(conn, BROADCAST_CONFIG_REVISION_SETTING)) + 1
         _write_setting(conn, key, value)
         _write_setting(conn, BROADCAST_CONFIG_REVISION_SETTING, str(revision))
@@ -167,6 +170,7 @@ def set_broadcast_filters_with_revision(filter_keys: object) -> int:
     )
 
 
+@invalidates_settings_cache
 def apply_broadcast_editor_stage(
     telegram_id: int,
     *,
@@ -178,8 +182,7 @@ def apply_broadcast_editor_stage(
     raw_saved_stage: str,
 ) -> dict[str, Any]:
     """Atomically apply a stage to working settings with two revision checks."""
-    with get_db() as conn:
-        conn.execute("BEGIN IMMEDIATE")
+    with get_db_tx() as conn:
         current_stage = _read_setting(conn, _stage_key(telegram_id))
         current_config = _safe_revision(
             _read_setting(conn, BROADCAST_CONFIG_REVISION_SETTING)
@@ -216,6 +219,7 @@ def apply_broadcast_editor_stage(
         }
 
 
+@invalidates_settings_cache
 def set_broadcast_confirmation_raw(telegram_id: int, raw_confirmation: str) -> None:
     """Replace the one-time launch confirmation for an administrator."""
     with get_db() as conn:
@@ -228,10 +232,10 @@ def get_broadcast_confirmation_raw(telegram_id: int) -> Optional[str]:
         return _read_setting(conn, _confirm_key(telegram_id))
 
 
+@invalidates_settings_cache
 def pop_broadcast_confirmation_raw(telegram_id: int, token: str) -> Optional[str]:
     """Consume a confirmation only when its token matches."""
-    with get_db() as conn:
-        conn.execute("BEGIN IMMEDIATE")
+    with get_db_tx() as conn:
         raw = _read_setting(conn, _confirm_key(telegram_id))
         if not raw:
             return None
@@ -245,6 +249,7 @@ def pop_broadcast_confirmation_raw(telegram_id: int, token: str) -> Optional[str
         return raw
 
 
+@invalidates_settings_cache
 def delete_broadcast_confirmation(telegram_id: int) -> bool:
     """Delete a pending launch confirmation."""
     with get_db() as conn:
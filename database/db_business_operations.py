@@ -6,7 +6,7 @@ import logging
 import sqlite3
 from typing import Any
 
-from .connection import get_db
+from .connection import fetchall_dicts, get_db
 
 logger = logging.getLogger(__name__)
 
@@ -364,7 +364,7 @@ def get_key_operation_history(key_id: int) -> list[dict[str, Any]]:
     """Returns the non-payment transaction history of the key."""
     with get_db() as conn:
         create_business_operation_tables(conn)
-        rows = conn.execute(
+        cursor = conn.execute(
             """
             SELECT
                 id,
@@ -384,8 +384,8 @@ def get_key_operation_history(key_id: int) -> list[dict[str, Any]]:
             ORDER BY created_at DESC
             """,
             (_positive_int(key_id, 'key_id'),),
-        ).fetchall()
-        return [dict(row) for row in rows]
+        )
+        return fetchall_dicts(cursor)
 
 
 def apply_balance_operation(
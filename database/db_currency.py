@@ -5,7 +5,9 @@ import sqlite3
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 from typing import Any
 
-from .connection import get_db
+from .connection import get_db, get_db_tx
+from .db_settings import invalidates_settings_cache
+from .db_tariffs import invalidates_tariffs_cache
 
 SUPPORTED_BASE_CURRENCIES = frozenset({'RUB', 'USD'})
 SUPPORTED_PAYMENT_CURRENCIES = frozenset({'RUB', 'USD', 'USDT', 'XTR'})
@@ -117,6 +119,8 @@ def list_currency_rates(*, base_currency: str | None = None) -> dict[str, str]:
     return rates
 
 
+@invalidates_settings_cache
+@invalidates_tariffs_cache
 def set_currency_rate(
     target_currency: str,
     units_per_base: object,
@@ -226,6 +230,8 @@ def preview_base_currency_switch(
     }
 
 
+@invalidates_settings_cache
+@invalidates_tariffs_cache
 def execute_base_currency_switch_record(
     *,
     expected_from_currency: str,
@@ -246,8 +252,7 @@ def execute_base_currency_switch_record(
         if from_units_per_to is not None
         else Decimal('1') / rate
     )
-    with get_db() as conn:
-        conn.execute('BEGIN IMMEDIATE')
+    with get_db_tx() as conn:
         row = conn.execute(
             "SELECT value FROM settings WHERE key = 'base_currency'"
         ).fetchone()
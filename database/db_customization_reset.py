@@ -9,6 +9,7 @@ from typing import Iterable
 
 from database import connection as db_connection
 from database import migrations
+from database.db_settings import invalidates_settings_cache
 
 STOCK_CUSTOM_PAGE_KEYS = {"custom_profile"}
 STOCK_PAGE_ROUTES = {
@@ -315,6 +316,7 @@ def _reset_extension_tables(conn: sqlite3.Connection, dry_run: bool) -> list[str
     return actions
 
 
+@invalidates_settings_cache
 def reset_customization_database(
     db_path: str | Path | None = None,
     *,
@@ -9,7 +9,7 @@ import sqlite3
 from collections.abc import Mapping, Sequence
 from typing import Any
 
-from .connection import get_db
+from .connection import fetchall_dicts, get_db
 
 logger = logging.getLogger(__name__)
 
@@ -249,8 +249,7 @@ class ExtensionTable:
         sql += f" LIMIT {safe_limit}"
 
         def op(conn: sqlite3.Connection) -> list[dict[str, Any]]:
-            rows = conn.execute(sql, params).fetchall()
-            return [dict(row) for row in rows]
+            return fetchall_dicts(conn.execute(sql, params))
 
         return self._storage._with_conn(op)
 
@@ -4,10 +4,11 @@ import secrets
 import string
 import datetime
 from typing import Optional, List, Dict, Any, Tuple
-from .connection import get_db
+from .connection import fetchall_column, fetchall_dicts, get_db
 from .db_tariffs import (
     _base_currency_and_rub_rate,
     ensure_admin_custom_tariff,
+    invalidates_tariffs_cache,
     normalize_tariff_money,
 )
 
@@ -44,7 +45,7 @@ def get_all_groups() -> List[Dict[str, Any]]:
             FROM tariff_groups
             ORDER BY sort_order, id
         """)
-        return [dict(row) for row in cursor.fetchall()]
+        return fetchall_dicts(cursor)
 
 def get_group_by_id(group_id: int) -> Optional[Dict[str, Any]]:
     """
@@ -66,6 +67,7 @@ def get_group_by_id(group_id: int) -> Optional[Dict[str, Any]]:
         row = cursor.fetchone()
         return dict(row) if row else None
 
+@invalidates_tariffs_cache
 def add_group(name: str) -> int:
     """
     Adds a new tariff group.
@@ -114,6 +116,7 @@ def update_group_name(group_id: int, name: str) -> bool:
             logger.info(f"Группа ID {group_id} переименована в '{name}'")
         return success
 
+@invalidates_tariffs_cache
 def delete_group(group_id: int) -> bool:
     """
     Deletes a tariff group. Group id=1 (“Main”) cannot be deleted.
@@ -275,7 +278,7 @@ def get_active_servers_by_group(group_id: int) -> List[Dict[str, Any]]:
             WHERE sg.group_id = ? AND s.is_active = 1
             ORDER BY s.id
         """, (group_id,))
-        return [dict(row) for row in cursor.fetchall()]
+        return fetchall_dicts(cursor)
 
 def get_server_group_ids(server_id: int) -> List[int]:
     """
@@ -286,7 +289,7 @@ def get_server_group_ids(server_id: int) -> List[int]:
             "SELECT group_id FROM server_groups WHERE server_id = ? ORDER BY group_id",
             (server_id,)
         )
-        return [row[0] for row in cursor.fetchall()]
+        return fetchall_column(cursor)
 
 def toggle_server_group(server_id: int, group_id: int) -> bool:
     """
@@ -361,21 +364,14 @@ def toggle_group_monthly_traffic_reset(group_id: int) -> Optional[bool]:
     with get_db() as conn:
         row = conn.execute(
             """
-            SELECT monthly_traffic_reset_enabled
-            FROM tariff_groups
+            UPDATE tariff_groups
+            SET monthly_traffic_reset_enabled =
+                CASE WHEN monthly_traffic_reset_enabled THEN 0 ELSE 1 END
             WHERE id = ?
+            RETURNING monthly_traffic_reset_enabled
             """,
             (int(group_id),),
         ).fetchone()
         if row is None:
             return None
-        enabled = not bool(row['monthly_traffic_reset_enabled'])
-        conn.execute(
-            """
-            UPDATE tariff_groups
-            SET monthly_traffic_reset_enabled = ?
-            WHERE id = ?
-            """,
-            (int(enabled), int(group_id)),
-        )
-        return enabled
+        return bool(row[0])
@@ -5,7 +5,7 @@ from __future__ import annotations
 import logging
 from typing import Any, Dict, List
 
-from .connection import get_db
+from .connection import get_db_tx
 
 logger = logging.getLogger(__name__)
 
@@ -24,8 +24,7 @@ def delete_expired_keys_older_than(
         raise ValueError("retention_days must be a positive integer")
 
     cutoff_modifier = f"-{retention_days} days"
-    with get_db() as conn:
-        conn.execute("BEGIN IMMEDIATE")
+    with get_db_tx() as conn:
         rows = conn.execute(
             """
             SELECT
@@ -5,7 +5,7 @@ import json
 import logging
 from typing import Any, Dict, List, Optional
 
-from .connection import get_db
+from .connection import fetchall_dicts, get_db
 
 logger = logging.getLogger(__name__)
 
@@ -44,7 +44,7 @@ def get_pending_expired_key_events(limit: Optional[int] = None) -> List[Dict[str
         params = (max(0, int(limit)),)
 
     with get_db() as conn:
-        return [dict(row) for row in conn.execute(sql, params).fetchall()]
+        return fetchall_dicts(conn.execute(sql, params))
 
 
 def record_key_lifecycle_event_once(
@@ -4,7 +4,7 @@ import secrets
 import string
 import datetime
 from typing import Optional, List, Dict, Any, Tuple
-from .connection import get_db
+from .connection import fetchall_dicts, get_db, get_db_read, sqlite_utc_text, utc_now
 
 logger = logging.getLogger(__name__)
 
@@ -36,14 +36,33 @@ __all__ = [
     'update_vpn_key_config',
     'update_vpn_key_sub_id',
     'delete_vpn_key',
+    'delete_vpn_keys',
     'get_all_keys_with_server',
     'get_user_keys_for_display',
+    'get_user_key_counts',
     'get_key_details_for_user',
     'update_key_custom_name',
     'add_days_to_first_active_key',
     'get_user_by_panel_email',
 ]
 
+def _days_modifier(days: int) -> str:
+    """SQLite datetime() modifier that shifts a timestamp by N days."""
+    return f"{int(days):+} days"
+
+
+def _expires_at_in(days: int) -> Optional[str]:
+    """
+    expires_at for a key valid N days from now, or None for an unlimited key.
+
+    Same UTC 'YYYY-MM-DD HH:MM:SS' text datetime('now', '+N days') produces.
+    """
+    days = int(days)
+    if days == 0:
+        return None
+    return sqlite_utc_text(utc_now() + datetime.timedelta(days=days))
+
+
 def get_user_vpn_keys(user_id: int) -> List[Dict[str, Any]]:
     """
     Receives all the user's VPN keys with data about the tariff and server.
@@ -67,7 +86,7 @@ def get_user_vpn_keys(user_id: int) -> List[Dict[str, Any]]:
             WHERE vk.user_id = ?
             ORDER BY vk.expires_at DESC
         """, (user_id,))
-        return [dict(row) for row in cursor.fetchall()]
+        return fetchall_dicts(cursor)
 
 def get_vpn_key_by_id(key_id: int) -> Optional[Dict[str, Any]]:
     """
@@ -120,7 +139,7 @@ def extend_vpn_key(
     """
     with get_db() as conn:
         normalized_days = int(days)
-        modifier = f"{normalized_days:+} days"
+        modifier = _days_modifier(normalized_days)
         cursor = conn.execute("""
             UPDATE vpn_keys 
             SET expires_at = CASE
@@ -146,7 +165,7 @@ def extend_vpn_key(
         ))
         success = cursor.rowcount > 0
         if success:
-            logger.info(f"Ключ ID {key_id} продлён на {days} дней")
+            logger.info("Ключ ID %s продлён на %s дней", key_id, days)
         return success
 
 def create_vpn_key_admin(
@@ -184,15 +203,12 @@ def create_vpn_key_admin(
             (user_id, server_id, tariff_id, panel_inbound_id, panel_email,
              client_uuid, custom_name, expires_at, traffic_limit,
              traffic_limit_override, max_ips_override)
-            VALUES (?, ?, ?, ?, ?, ?, ?,
-                    CASE WHEN ? = 0 THEN NULL
-                         ELSE datetime('now', '+' || ? || ' days') END,
-                    ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (user_id, server_id, tariff_id, panel_inbound_id, panel_email,
-              client_uuid, custom_name, days, days, traffic_limit,
+              client_uuid, custom_name, _expires_at_in(days), traffic_limit,
               traffic_limit_override, max_ips_override))
         key_id = cursor.lastrowid
-        logger.info(f"Администратор создал ключ ID {key_id} для user_id {user_id}")
+        logger.info("Администратор создал ключ ID %s для user_id %s", key_id, user_id)
         return key_id
 
 def update_vpn_key_connection(
@@ -242,7 +258,7 @@ def update_vpn_key_connection(
         success = cursor.rowcount > 0
         if success:
             preview = (client_uuid[:4] + '...') if client_uuid else '?'
-            logger.info(f"Ключ ID {key_id} перенесён на сервер {server_id} (новый UUID: {preview})")
+            logger.info("Ключ ID %s перенесён на сервер %s (новый UUID: %s)", key_id, server_id, preview)
         return success
 
 def create_vpn_key(
@@ -276,11 +292,8 @@ def _create_initial_vpn_key_with_conn(
     cursor = conn.execute("""
         INSERT INTO vpn_keys
         (user_id, tariff_id, custom_name, expires_at, created_at, traffic_limit)
-        VALUES (?, ?, ?,
-                CASE WHEN ? = 0 THEN NULL
-                     ELSE datetime('now', '+' || ? || ' days') END,
-                CURRENT_TIMESTAMP, ?)
-    """, (user_id, tariff_id, custom_name, days, days, traffic_limit))
+        VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP, ?)
+    """, (user_id, tariff_id, custom_name, _expires_at_in(days), traffic_limit))
     return int(cursor.lastrowid)
 
 
@@ -437,11 +450,11 @@ def get_all_active_keys_with_server() -> List[Dict[str, Any]]:
             JOIN tariff_groups tg ON t.group_id = tg.id
             JOIN servers s ON vk.server_id = s.id
             JOIN users u ON vk.user_id = u.id
-            WHERE (vk.expires_at > datetime('now') OR vk.expires_at IS NULL)
+            WHERE (vk.expires_at > ? OR vk.expires_at IS NULL)
             AND vk.panel_email IS NOT NULL
             AND s.is_active = 1
-        """)
-        return [dict(row) for row in cursor.fetchall()]
+        """, (sqlite_utc_text(),))
+        return fetchall_dicts(cursor)
 
 
 def get_active_keys_for_monthly_traffic_reset() -> List[Dict[str, Any]]:
@@ -461,12 +474,13 @@ def get_active_keys_for_monthly_traffic_reset() -> List[Dict[str, Any]]:
             FROM vpn_keys vk
             JOIN tariffs t ON t.id = vk.tariff_id
             JOIN tariff_groups tg ON tg.id = t.group_id
-            WHERE (vk.expires_at > datetime('now') OR vk.expires_at IS NULL)
+            WHERE (vk.expires_at > ? OR vk.expires_at IS NULL)
               AND tg.monthly_traffic_reset_enabled = 1
             ORDER BY vk.id
-            """
+            """,
+            (sqlite_utc_text(),),
         )
-        return [dict(row) for row in cursor.fetchall()]
+        return fetchall_dicts(cursor)
 
 
 def get_all_panel_sync_keys() -> List[Dict[str, Any]]:
@@ -490,7 +504,7 @@ def get_all_panel_sync_keys() -> List[Dict[str, Any]]:
             WHERE vk.panel_email IS NOT NULL
               AND s.is_active = 1
         """)
-        return [dict(row) for row in cursor.fetchall()]
+        return fetchall_dicts(cursor)
 
 def get_all_keys_with_server() -> List[Dict[str, Any]]:
     """
@@ -513,7 +527,7 @@ def get_all_keys_with_server() -> List[Dict[str, Any]]:
             WHERE vk.panel_email IS NOT NULL
             AND s.is_active = 1
         """)
-        return [dict(row) for row in cursor.fetchall()]
+        return fetchall_dicts(cursor)
 
 def bulk_update_traffic(updates: List[tuple]) -> None:
     """
@@ -531,7 +545,7 @@ def bulk_update_traffic(updates: List[tuple]) -> None:
             SET traffic_used = ?, traffic_updated_at = CURRENT_TIMESTAMP
             WHERE id = ?
         """, updates)
-        logger.info(f"Обновлён трафик для {len(updates)} ключей")
+        logger.info("Обновлён трафик для %s ключей", len(updates))
 
 def apply_panel_import_batch(updates: List[Dict[str, Any]]) -> int:
     """Atomically apply a normalized Panel -> DB import for one server."""
@@ -664,8 +678,9 @@ def update_vpn_key_tariff_and_traffic_limit(
             limit_text = f"{limit_gb:.1f} ГБ" if new_limit > 0 else "безлимит"
             added_gb = traffic_limit_bytes / (1024 ** 3) if traffic_limit_bytes > 0 else 0
             logger.info(
-                f"Ключ ID {key_id} переведён на тариф {tariff_id}, "
-                f"добавлено: {added_gb:.1f} ГБ, накопительный лимит: {limit_text}"
+                "Ключ ID %s переведён на тариф %s, "
+                "добавлено: %.1f ГБ, накопительный лимит: %s",
+                key_id, tariff_id, added_gb, limit_text,
             )
         return success
 
@@ -715,10 +730,7 @@ def reissue_vpn_key_plan(
             """
             UPDATE vpn_keys
             SET tariff_id = ?,
-                expires_at = CASE
-                    WHEN ? = 0 THEN NULL
-                    ELSE datetime('now', '+' || ? || ' days')
-                END,
+                expires_at = ?,
                 traffic_used = 0,
                 traffic_limit = ?,
                 traffic_updated_at = NULL,
@@ -729,8 +741,7 @@ def reissue_vpn_key_plan(
             """,
             (
                 int(tariff_id),
-                duration,
-                duration,
+                _expires_at_in(duration),
                 traffic_limit,
                 traffic_limit_override,
                 max_ips_override,
@@ -861,17 +872,15 @@ def create_vpn_key_subscription_admin(
             (user_id, server_id, tariff_id, panel_inbound_id, panel_email,
              client_uuid, sub_id, custom_name, expires_at, traffic_limit,
              traffic_limit_override, max_ips_override)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?,
-                    CASE WHEN ? = 0 THEN NULL
-                         ELSE datetime('now', '+' || ? || ' days') END,
-                    ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (user_id, server_id, tariff_id, panel_inbound_id, panel_email,
-              client_uuid, sub_id, custom_name, days, days, traffic_limit,
+              client_uuid, sub_id, custom_name, _expires_at_in(days), traffic_limit,
               traffic_limit_override, max_ips_override))
         key_id = cursor.lastrowid
         logger.info(
-            f"Администратор создал subscription-ключ ID {key_id} для user_id {user_id} "
-            f"(sub_id={sub_id[:8]}...)"
+            "Администратор создал subscription-ключ ID %s для user_id %s "
+            "(sub_id=%s...)",
+            key_id, user_id, sub_id[:8],
         )
         return key_id
 
@@ -896,9 +905,63 @@ def delete_vpn_key(key_id: int) -> bool:
         cursor = conn.execute("DELETE FROM vpn_keys WHERE id = ?", (key_id,))
         success = cursor.rowcount > 0
         if success:
-            logger.info(f"Ключ ID {key_id} удален из БД")
+            logger.info("Ключ ID %s удален из БД", key_id)
         return success
 
+# Ids per IN (...) list; stays under the 999-variable limit of older SQLite builds.
+_KEY_ID_BATCH_SIZE = 500
+
+
+def delete_vpn_keys(key_ids: List[int]) -> int:
+    """
+    Removes several VPN keys from the database in one transaction.
+
+    Same cleanup as delete_vpn_key, but with IN (...) lists instead of
+    three statements and a commit per key.
+
+    Args:
+        key_ids: Key IDs
+
+    Returns:
+        Number of deleted keys
+    """
+    ids = list(dict.fromkeys(int(key_id) for key_id in key_ids))
+    deleted = 0
+    with get_db() as conn:
+        for start in range(0, len(ids), _KEY_ID_BATCH_SIZE):
+            batch = ids[start:start + _KEY_ID_BATCH_SIZE]
+            placeholders = ",".join("?" for _ in batch)
+            conn.execute(
+                f"UPDATE payments SET vpn_key_id = NULL WHERE vpn_key_id IN ({placeholders})",
+                batch,
+            )
+            conn.execute(
+                f"DELETE FROM notification_log WHERE vpn_key_id IN ({placeholders})",
+                batch,
+            )
+            cursor = conn.execute(
+                f"DELETE FROM vpn_keys WHERE id IN ({placeholders})",
+                batch,
+            )
+            deleted += cursor.rowcount
+    if deleted:
+        logger.info("Удалено ключей из БД: %s", deleted)
+    return deleted
+
+# Name shown for a key in the user UI: its custom name, else a shortened
+# client UUID, else its number (flagged when no server is attached yet).
+_KEY_DISPLAY_NAME_SQL = """
+    COALESCE(
+        NULLIF(vk.custom_name, ''),
+        CASE
+            WHEN COALESCE(vk.client_uuid, '') != ''
+                THEN substr(vk.client_uuid, 1, 4) || '...' || substr(vk.client_uuid, -4)
+            WHEN s.id IS NULL THEN 'Ключ #' || vk.id || ' (Не настроен)'
+            ELSE 'Ключ #' || vk.id
+        END
+    ) AS display_name
+"""
+
 def get_user_keys_for_display(telegram_id: int) -> List[Dict[str, Any]]:
     """
     Retrieves the user's keys for display in the My Keys section.
@@ -922,34 +985,44 @@ def get_user_keys_for_display(telegram_id: int) -> List[Dict[str, Any]]:
                 t.group_id as tariff_group_id,
                 CASE
                     WHEN vk.expires_at IS NULL
-                      OR vk.expires_at > datetime('now') THEN 1
+                      OR vk.expires_at > ? THEN 1
                     ELSE 0
-                END as is_active
+                END as is_active,
+        """ + _KEY_DISPLAY_NAME_SQL + """
             FROM vpn_keys vk
             LEFT JOIN servers s ON vk.server_id = s.id
             LEFT JOIN tariffs t ON vk.tariff_id = t.id
             JOIN users u ON vk.user_id = u.id
             WHERE u.telegram_id = ?
             ORDER BY vk.expires_at DESC
-        """, (telegram_id,))
-        
-        keys = []
-        for row in cursor.fetchall():
-            key = dict(row)
-            # Forming display_name
-            if key['custom_name']:
-                key['display_name'] = key['custom_name']
-            elif key['client_uuid']:
-                uuid = key['client_uuid']
-                key['display_name'] = f"{uuid[:4]}...{uuid[-4:]}"
-            else:
-                if not key['server_id']:
-                     key['display_name'] = f"Ключ #{key['id']} (Не настроен)"
-                else:
-                     key['display_name'] = f"Ключ #{key['id']}"
-            keys.append(key)
-        
-        return keys
+        """, (sqlite_utc_text(), telegram_id))
+        return fetchall_dicts(cursor)
+
+
+def get_user_key_counts(telegram_id: int) -> Tuple[int, int]:
+    """
+    Counts the user's keys without loading their display rows.
+
+    Uses the same activity rule as get_user_keys_for_display.
+
+    Args:
+        telegram_id: Telegram user ID
+
+    Returns:
+        (total_keys, active_keys)
+    """
+    with get_db_read() as conn:
+        total, active = conn.execute("""
+            SELECT
+                COUNT(*),
+                COALESCE(SUM(
+                    vk.expires_at IS NULL OR vk.expires_at > ?
+                ), 0)
+            FROM vpn_keys vk
+            JOIN users u ON vk.user_id = u.id
+            WHERE u.telegram_id = ?
+        """, (sqlite_utc_text(), telegram_id)).fetchone()
+        return total, active
 
 def get_key_details_for_user(key_id: int, telegram_id: int) -> Optional[Dict[str, Any]]:
     """
@@ -976,33 +1049,21 @@ def get_key_details_for_user(key_id: int, telegram_id: int) -> Optional[Dict[str
                 s.is_active as server_active,
                 CASE 
                     WHEN vk.expires_at IS NULL
-                      OR vk.expires_at > datetime('now') THEN 1
+                      OR vk.expires_at > ? THEN 1
                     ELSE 0 
-                END as is_active
+                END as is_active,
+        """ + _KEY_DISPLAY_NAME_SQL + """
             FROM vpn_keys vk
             LEFT JOIN servers s ON vk.server_id = s.id
             LEFT JOIN tariffs t ON vk.tariff_id = t.id
             JOIN users u ON vk.user_id = u.id
             WHERE vk.id = ? AND u.telegram_id = ?
-        """, (key_id, telegram_id))
+        """, (sqlite_utc_text(), key_id, telegram_id))
         row = cursor.fetchone()
         if not row:
             return None
         
-        key = dict(row)
-        # Forming display_name
-        if key['custom_name']:
-            key['display_name'] = key['custom_name']
-        elif key['client_uuid']:
-            uuid = key['client_uuid']
-            key['display_name'] = f"{uuid[:4]}...{uuid[-4:]}"
-        else:
-            if not key['server_id']:
-                 key['display_name'] = f"Ключ #{key['id']} (Не настроен)"
-            else:
-                 key['display_name'] = f"Ключ #{key['id']}"
-        
-        return key
+        return dict(row)
 
 def update_key_custom_name(key_id: int, telegram_id: int, new_name: str) -> bool:
     """
@@ -1017,18 +1078,20 @@ def update_key_custom_name(key_id: int, telegram_id: int, new_name: str) -> bool
         True if successful
     """
     if new_name and len(new_name) > MAX_KEY_CUSTOM_NAME_LENGTH:
-        logger.warning(f"Попытка установить слишком длинное имя ключа {key_id}: {new_name}")
+        logger.warning("Попытка установить слишком длинное имя ключа %s: %s", key_id, new_name)
         return False
 
-    key = get_key_details_for_user(key_id, telegram_id)
-    if not key:
-        return False
-    
     with get_db() as conn:
-        conn.execute("""
-            UPDATE vpn_keys SET custom_name = ? WHERE id = ?
-        """, (new_name or None, key_id))
-        logger.info(f"Ключ {key_id}: переименован в '{new_name}'")
+        # Ownership is checked in the WHERE clause: another user's key id
+        # simply matches no row.
+        cursor = conn.execute("""
+            UPDATE vpn_keys SET custom_name = ?
+            WHERE id = ?
+              AND user_id = (SELECT id FROM users WHERE telegram_id = ?)
+        """, (new_name or None, key_id, telegram_id))
+        if cursor.rowcount <= 0:
+            return False
+        logger.info("Ключ %s: переименован в '%s'", key_id, new_name)
         return True
 
 def add_days_to_first_active_key(user_id: int, days: int) -> bool:
@@ -1046,24 +1109,24 @@ def add_days_to_first_active_key(user_id: int, days: int) -> bool:
         cursor = conn.execute("""
             SELECT id FROM vpn_keys 
             WHERE user_id = ?
-              AND (expires_at > datetime('now') OR expires_at IS NULL)
+              AND (expires_at > ? OR expires_at IS NULL)
             ORDER BY expires_at IS NULL, expires_at DESC
             LIMIT 1
-        """, (user_id,))
+        """, (user_id, sqlite_utc_text()))
         row = cursor.fetchone()
         
         if not row:
-            logger.info(f"Нет активных ключей у пользователя {user_id} для добавления дней")
+            logger.info("Нет активных ключей у пользователя %s для добавления дней", user_id)
             return False
         
         key_id = row['id']
         conn.execute("""
             UPDATE vpn_keys 
-            SET expires_at = datetime(expires_at, '+' || ? || ' days')
+            SET expires_at = datetime(expires_at, ?)
             WHERE id = ?
-        """, (days, key_id))
+        """, (_days_modifier(days), key_id))
         
-        logger.info(f"Ключ {key_id} пользователя {user_id} продлён на {days} дней (реферальное вознаграждение)")
+        logger.info("Ключ %s пользователя %s продлён на %s дней (реферальное вознаграждение)", key_id, user_id, days)
         return True
 
 def get_user_by_panel_email(email: str) -> Optional[Dict[str, Any]]:
@@ -7,8 +7,9 @@ import logging
 import secrets
 from typing import Any, Dict, List, Optional
 
-from .connection import get_db
+from .connection import get_db, get_db_tx
 from .db_promotions import BASE62_ALPHABET
+from .db_settings import invalidates_settings_cache
 
 logger = logging.getLogger(__name__)
 
@@ -141,6 +142,7 @@ def _cancel_pending_deliveries(conn, reason: str) -> int:
     return max(0, int(cursor.rowcount or 0))
 
 
+@invalidates_settings_cache
 def set_lapsed_coupon_enabled(enabled: bool) -> None:
     """Toggle the feature and start every enabled window without a backlog."""
     target = bool(enabled)
@@ -173,6 +175,7 @@ def get_lapsed_coupon_discount_percent() -> int:
         )
 
 
+@invalidates_settings_cache
 def set_lapsed_coupon_discount_percent(discount_percent: int) -> None:
     percent = int(discount_percent)
     if not 0 <= percent <= 100:
@@ -189,6 +192,7 @@ def get_lapsed_coupon_lifetime_days() -> int:
         )
 
 
+@invalidates_settings_cache
 def set_lapsed_coupon_lifetime_days(days: int) -> None:
     lifetime = int(days)
     if lifetime <= 0:
@@ -205,6 +209,7 @@ def get_lapsed_coupon_delay_days() -> int:
         )
 
 
+@invalidates_settings_cache
 def set_lapsed_coupon_delay_days(days: int) -> None:
     delay = int(days)
     if not 1 <= delay <= 30:
@@ -509,8 +514,7 @@ def ensure_lapsed_coupon_for_delivery(
 ) -> Optional[Dict[str, Any]]:
     """Atomically recheck one due episode and create its stable coupon."""
     delivery_id = int(delivery_id)
-    with get_db() as conn:
-        conn.execute("BEGIN IMMEDIATE")
+    with get_db_tx() as conn:
         if _setting_value(conn, COUPON_LAPSED_ENABLED_KEY, "0") != "1":
             return None
         enabled_since = _setting_value(
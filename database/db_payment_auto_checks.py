@@ -4,7 +4,7 @@ from __future__ import annotations
 import sqlite3
 from typing import Any, Optional
 
-from .connection import get_db
+from .connection import fetchall_dicts, get_db
 
 
 AUTO_CHECK_STATES = {
@@ -101,7 +101,7 @@ def get_due_payment_auto_checks(limit: int = 10) -> list[dict[str, Any]]:
             if {'intent_version', 'purpose'}.issubset(payment_columns)
             else "0 AS intent_version, NULL AS purpose,"
         )
-        rows = conn.execute(
+        cursor = conn.execute(
             f"""
             SELECT pac.*, p.payment_type, p.status AS order_status,
                    {intent_select}
@@ -124,8 +124,8 @@ def get_due_payment_auto_checks(limit: int = 10) -> list[dict[str, Any]]:
             LIMIT ?
             """,
             (normalized_limit,),
-        ).fetchall()
-        return [dict(row) for row in rows]
+        )
+        return fetchall_dicts(cursor)
 
 
 def record_payment_auto_check_attempt(order_id: str) -> bool:
@@ -7,7 +7,7 @@ from collections.abc import Mapping
 from typing import Any, Optional
 
 from .connection import get_db
-from .db_payments import _int_to_base62
+from .db_payments import _int_to_base62, _reserve_payment_id
 
 
 def create_payment_intent_record(
@@ -36,10 +36,12 @@ def create_payment_intent_record(
         raise ValueError('base_currency must be RUB or USD')
 
     with get_db() as conn:
-        cursor = conn.execute(
+        payment_id = _reserve_payment_id(conn)
+        order_id = '00' + _int_to_base62(payment_id)
+        conn.execute(
             """
             INSERT INTO payments (
-                user_id, tariff_id, order_id, payment_type, vpn_key_id,
+                id, user_id, tariff_id, order_id, payment_type, vpn_key_id,
                 amount_cents, amount_stars, period_days, status, paid_at,
                 intent_version, purpose, purpose_data_json,
                 nominal_amount_cents, payable_amount_cents,
@@ -48,14 +50,16 @@ def create_payment_intent_record(
                 fulfillment_status, created_at
             )
             VALUES (
-                ?, ?, 'pending', NULL, ?,
+                ?, ?, ?, ?, NULL, ?,
                 ?, 0, ?, 'pending', NULL,
                 1, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'pending', CURRENT_TIMESTAMP
             )
             """,
             (
+                payment_id,
                 int(user_id),
                 tariff_id,
+                order_id,
                 vpn_key_id,
                 amount,
                 period_days,
@@ -71,12 +75,6 @@ def create_payment_intent_record(
                 cancel,
             ),
         )
-        payment_id = int(cursor.lastrowid)
-        order_id = '00' + _int_to_base62(payment_id)
-        conn.execute(
-            "UPDATE payments SET order_id = ? WHERE id = ?",
-            (order_id, payment_id),
-        )
         return payment_id, order_id
 
 
@@ -3,13 +3,16 @@ import logging
 import secrets
 import string
 import datetime
+import json
 from typing import Optional, List, Dict, Any, Tuple
-from .connection import get_db
+from .connection import fetchall_column, fetchall_dicts, get_db, get_db_read, get_db_tx
 
 logger = logging.getLogger(__name__)
 BASE62_ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+# Every two-digit base62 string, indexed by its value (0..62**2 - 1).
+_BASE62_PAIRS = tuple(high + low for high in BASE62_ALPHABET for low in BASE62_ALPHABET)
 
-from .db_tariffs import get_tariff_by_id
+from .db_tariffs import _get_tariffs_cache, get_tariff_by_id
 from .db_settings import get_setting, set_setting
 
 __all__ = [
@@ -36,10 +39,10 @@ __all__ = [
     'update_order_tariff',
     'update_payment_type',
     'update_payment_key_id',
+    'create_order_draft_key',
     'save_payment_balance_deduction',
     'cancel_pending_order',
     'is_order_already_paid',
-    'get_key_payments_history',
     'get_referral_levels',
     'get_active_referral_levels',
     'update_referral_level',
@@ -135,7 +138,7 @@ def save_yookassa_payment_id(order_id: str, yookassa_payment_id: str) -> bool:
         )
         success = cursor.rowcount > 0
         if success:
-            logger.info(f"Сохранён yookassa_payment_id={yookassa_payment_id} для order_id={order_id}")
+            logger.info("Сохранён yookassa_payment_id=%s для order_id=%s", yookassa_payment_id, order_id)
         return success
 
 def find_order_by_yookassa_id(yookassa_payment_id: str) -> Optional[Dict[str, Any]]:
@@ -174,7 +177,7 @@ def save_wata_link_id(order_id: str, wata_link_id: str) -> bool:
         )
         success = cursor.rowcount > 0
         if success:
-            logger.info(f"Сохранён wata_link_id={wata_link_id} для order_id={order_id}")
+            logger.info("Сохранён wata_link_id=%s для order_id=%s", wata_link_id, order_id)
         return success
 
 def find_order_by_wata_link_id(wata_link_id: str) -> Optional[Dict[str, Any]]:
@@ -213,7 +216,7 @@ def save_platega_transaction_id(order_id: str, transaction_id: str) -> bool:
         )
         success = cursor.rowcount > 0
         if success:
-            logger.info(f"Сохранён platega_transaction_id={transaction_id} для order_id={order_id}")
+            logger.info("Сохранён platega_transaction_id=%s для order_id=%s", transaction_id, order_id)
         return success
 
 def find_order_by_platega_transaction_id(transaction_id: str) -> Optional[Dict[str, Any]]:
@@ -252,7 +255,7 @@ def save_cardlink_bill_id(order_id: str, bill_id: str) -> bool:
         )
         success = cursor.rowcount > 0
         if success:
-            logger.info(f"Сохранён cardlink_bill_id={bill_id} для order_id={order_id}")
+            logger.info("Сохранён cardlink_bill_id=%s для order_id=%s", bill_id, order_id)
         return success
 
 def find_order_by_cardlink_bill_id(bill_id: str) -> Optional[Dict[str, Any]]:
@@ -322,12 +325,23 @@ def get_user_payments_stats(user_id: int) -> Dict[str, Any]:
                 COALESCE(SUM(CASE WHEN COALESCE(intent_version, 0) != 1 AND payment_type = 'crypto' THEN COALESCE(final_amount_cents, amount_cents, 0) ELSE 0 END), 0) as total_amount_cents,
                 COALESCE(SUM(CASE WHEN COALESCE(intent_version, 0) != 1 AND payment_type = 'stars' THEN COALESCE(final_amount_stars, amount_stars, 0) ELSE 0 END), 0) as total_amount_stars,
                 COALESCE(SUM(CASE WHEN COALESCE(intent_version, 0) != 1 AND payment_type IN ('cards', 'yookassa_qr', 'wata', 'platega', 'cardlink', 'balance') THEN COALESCE(final_amount_cents, t.price_rub * 100, 0) ELSE 0 END), 0) / 100.0 as total_amount_rub,
-                MAX(paid_at) as last_payment_at
+                MAX(paid_at) as last_payment_at,
+                (
+                    SELECT json_group_array(name) FROM (
+                        SELECT DISTINCT ut.name
+                        FROM payments up
+                        JOIN tariffs ut ON up.tariff_id = ut.id
+                        WHERE up.user_id = ?
+                    )
+                ) as tariffs
             FROM payments p
             LEFT JOIN tariffs t ON p.tariff_id = t.id
             WHERE p.user_id = ? AND p.status = 'paid'
-        """, (user_id,))
+        """, (user_id, user_id))
         stats = dict(cursor.fetchone())
+        # Unique tariffs across all of the user's orders, as a JSON array
+        # so names containing commas survive.
+        stats['tariffs'] = json.loads(stats['tariffs'])
         base_rows = conn.execute(
             """
             SELECT COALESCE(NULLIF(UPPER(base_currency), ''), 'RUB') AS currency,
@@ -343,15 +357,6 @@ def get_user_payments_stats(user_id: int) -> Dict[str, Any]:
             for row in base_rows
         }
         
-        # Unique rates
-        cursor = conn.execute("""
-            SELECT DISTINCT t.name 
-            FROM payments p
-            JOIN tariffs t ON p.tariff_id = t.id
-            WHERE p.user_id = ?
-        """, (user_id,))
-        stats['tariffs'] = [row['name'] for row in cursor.fetchall()]
-        
         return stats
 
 def get_daily_payments_stats() -> Dict[str, Any]:
@@ -365,111 +370,35 @@ def get_daily_payments_stats() -> Dict[str, Any]:
         - paid_stars: sum of successful ones in stars
         - pending_count: number of pending (unpaid)
     """
-    with get_db() as conn:
-        # 1. We count USDT (crypto)
-        cursor = conn.execute("""
-            SELECT 
-                COUNT(*) as count,
-                COALESCE(SUM(CASE WHEN COALESCE(intent_version, 0) != 1 THEN COALESCE(final_amount_cents, amount_cents, 0) ELSE 0 END), 0) as total_cents
-            FROM payments
-            WHERE status = 'paid' 
-            AND payment_type = 'crypto'
-            AND paid_at >= datetime('now', '-1 day')
-        """)
-        crypto_row = cursor.fetchone()
-        
-        # 2. Count Stars
-        cursor = conn.execute("""
-            SELECT 
-                COUNT(*) as count,
-                COALESCE(SUM(CASE WHEN COALESCE(intent_version, 0) != 1 THEN COALESCE(final_amount_stars, amount_stars, 0) ELSE 0 END), 0) as total_stars
-            FROM payments
-            WHERE status = 'paid' 
-            AND payment_type = 'stars'
-            AND paid_at >= datetime('now', '-1 day')
-        """)
-        stars_row = cursor.fetchone()
-        
-        # 3. We count TG payments (historical payment_type 'cards')
-        cursor = conn.execute("""
-            SELECT 
-                COUNT(*) as count,
-                COALESCE(SUM(CASE WHEN COALESCE(p.intent_version, 0) != 1 THEN COALESCE(p.final_amount_cents, t.price_rub * 100, 0) ELSE 0 END), 0) / 100.0 as total_rub
-            FROM payments p
-            LEFT JOIN tariffs t ON p.tariff_id = t.id
-            WHERE p.status = 'paid' 
-            AND p.payment_type = 'cards'
-            AND p.paid_at >= datetime('now', '-1 day')
-        """)
-        cards_row = cursor.fetchone()
-        
-        # 4. We count YuKassa (historical payment_type 'yookassa_qr')
-        cursor = conn.execute("""
-            SELECT
-                COUNT(*) as count,
-                COALESCE(SUM(CASE WHEN COALESCE(p.intent_version, 0) != 1 THEN COALESCE(p.final_amount_cents, t.price_rub * 100, 0) ELSE 0 END), 0) / 100.0 as total_rub
-            FROM payments p
-            LEFT JOIN tariffs t ON p.tariff_id = t.id
-            WHERE p.status = 'paid'
-            AND p.payment_type = 'yookassa_qr'
-            AND p.paid_at >= datetime('now', '-1 day')
-        """)
-        qr_row = cursor.fetchone()
-
-        # 5. We count WATA (Card/SBP - Rubles)
-        cursor = conn.execute("""
-            SELECT
-                COUNT(*) as count,
-                COALESCE(SUM(CASE WHEN COALESCE(p.intent_version, 0) != 1 THEN COALESCE(p.final_amount_cents, t.price_rub * 100, 0) ELSE 0 END), 0) / 100.0 as total_rub
-            FROM payments p
-            LEFT JOIN tariffs t ON p.tariff_id = t.id
-            WHERE p.status = 'paid'
-            AND p.payment_type = 'wata'
-            AND p.paid_at >= datetime('now', '-1 day')
-        """)
-        wata_row = cursor.fetchone()
-
-        # 6. Count Platega (Rubles)
-        cursor = conn.execute("""
+    with get_db_read() as conn:
+        # One pass over the last day's paid rows: crypto is counted in
+        # cents, Stars in stars, every card/SBP provider in rubles.
+        row = conn.execute("""
             SELECT
-                COUNT(*) as count,
-                COALESCE(SUM(CASE WHEN COALESCE(p.intent_version, 0) != 1 THEN COALESCE(p.final_amount_cents, t.price_rub * 100, 0) ELSE 0 END), 0) / 100.0 as total_rub
+                COUNT(*) AS paid_count,
+                COALESCE(SUM(CASE WHEN p.payment_type = 'crypto'
+                                   AND COALESCE(p.intent_version, 0) != 1
+                                  THEN COALESCE(p.final_amount_cents, p.amount_cents, 0)
+                                  ELSE 0 END), 0) AS total_cents,
+                COALESCE(SUM(CASE WHEN p.payment_type = 'stars'
+                                   AND COALESCE(p.intent_version, 0) != 1
+                                  THEN COALESCE(p.final_amount_stars, p.amount_stars, 0)
+                                  ELSE 0 END), 0) AS total_stars,
+                COALESCE(SUM(CASE WHEN p.payment_type IN ('cards', 'yookassa_qr', 'wata', 'platega', 'cardlink')
+                                   AND COALESCE(p.intent_version, 0) != 1
+                                  THEN COALESCE(p.final_amount_cents, t.price_rub * 100, 0)
+                                  ELSE 0 END), 0) / 100.0 AS total_rub
             FROM payments p
             LEFT JOIN tariffs t ON p.tariff_id = t.id
             WHERE p.status = 'paid'
-            AND p.payment_type = 'platega'
+            AND p.payment_type IN ('crypto', 'stars', 'cards', 'yookassa_qr', 'wata', 'platega', 'cardlink')
             AND p.paid_at >= datetime('now', '-1 day')
-        """)
-        platega_row = cursor.fetchone()
+        """).fetchone()
+        paid_count = row['paid_count']
+        total_cents = row['total_cents']
+        total_stars = row['total_stars']
+        total_rub = row['total_rub']
 
-        # 7. We count Cardlink (Card/SBP - Rubles)
-        cursor = conn.execute("""
-            SELECT
-                COUNT(*) as count,
-                COALESCE(SUM(CASE WHEN COALESCE(p.intent_version, 0) != 1 THEN COALESCE(p.final_amount_cents, t.price_rub * 100, 0) ELSE 0 END), 0) / 100.0 as total_rub
-            FROM payments p
-            LEFT JOIN tariffs t ON p.tariff_id = t.id
-            WHERE p.status = 'paid'
-            AND p.payment_type = 'cardlink'
-            AND p.paid_at >= datetime('now', '-1 day')
-        """)
-        cardlink_row = cursor.fetchone()
-
-        paid_count = (crypto_row['count'] if crypto_row else 0) + \
-                     (stars_row['count'] if stars_row else 0) + \
-                     (cards_row['count'] if cards_row else 0) + \
-                     (qr_row['count'] if qr_row else 0) + \
-                     (wata_row['count'] if wata_row else 0) + \
-                     (platega_row['count'] if platega_row else 0) + \
-                     (cardlink_row['count'] if cardlink_row else 0)
-        total_cents = crypto_row['total_cents'] if crypto_row else 0
-        total_stars = stars_row['total_stars'] if stars_row else 0
-        total_rub = (cards_row['total_rub'] if cards_row else 0) + \
-                    (qr_row['total_rub'] if qr_row else 0) + \
-                    (wata_row['total_rub'] if wata_row else 0) + \
-                    (platega_row['total_rub'] if platega_row else 0) + \
-                    (cardlink_row['total_rub'] if cardlink_row else 0)
-        
         base_rows = conn.execute(
             """
             SELECT COALESCE(NULLIF(UPPER(base_currency), ''), 'RUB') AS currency,
@@ -492,37 +421,6 @@ def get_daily_payments_stats() -> Dict[str, Any]:
             },
         }
 
-def get_key_payments_history(key_id: int) -> List[Dict[str, Any]]:
-    """
-    Retrieves payment history for a specific key.
-    
-    Args:
-        key_id: Key ID
-    
-    Returns:
-        List of payments sorted by date (descending).
-    """
-    with get_db() as conn:
-        from database.db_business_operations import create_business_operation_tables, get_key_operation_history
-
-        create_business_operation_tables(conn)
-        cursor = conn.execute("""
-            SELECT 
-                p.id, p.paid_at, p.payment_type, p.amount_cents, p.amount_stars,
-                p.final_amount_cents, p.final_amount_stars, p.promo_code,
-                p.intent_version, p.base_currency,
-                p.payable_amount_minor, p.payable_amount_cents,
-                t.name as tariff_name, t.price_rub,
-                'payment' AS history_type
-            FROM payments p
-            LEFT JOIN tariffs t ON p.tariff_id = t.id
-            WHERE p.vpn_key_id = ? AND p.status = 'paid'
-            ORDER BY p.paid_at DESC
-        """, (key_id,))
-        rows = [dict(row) for row in cursor.fetchall()]
-    rows.extend(get_key_operation_history(key_id))
-    return _sort_key_history_rows(rows)
-
 def _int_to_base62(num: int) -> str:
     """
     Converts a number to a base62 string.
@@ -533,15 +431,36 @@ def _int_to_base62(num: int) -> str:
     Returns:
         Base62 string (0-9, A-Z, a-z)
     """
-    if num == 0:
-        return BASE62_ALPHABET[0]
-    
-    result = []
-    while num > 0:
-        result.append(BASE62_ALPHABET[num % 62])
-        num //= 62
-    
-    return ''.join(reversed(result))
+    # Two digits per divmod via the precomputed pair table.
+    result = ''
+    while num >= 3844:
+        num, pair = divmod(num, 3844)
+        result = _BASE62_PAIRS[pair] + result
+    if num >= 62:
+        return _BASE62_PAIRS[num] + result
+    return BASE62_ALPHABET[num] + result
+
+def _reserve_payment_id(conn: sqlite3.Connection) -> int:
+    """
+    Reserves the next payments.id inside the current write transaction.
+
+    payments.id is AUTOINCREMENT, so SQLite keeps the last issued id in
+    sqlite_sequence; bumping it there hands out the same ids an ordinary
+    INSERT would, and an explicit id equal to seq leaves it unchanged.
+    """
+    row = conn.execute(
+        "UPDATE sqlite_sequence SET seq = seq + 1 WHERE name = 'payments' RETURNING seq"
+    ).fetchone()
+    if row is None:
+        # No payment row has ever been inserted, so there is no sequence row yet.
+        row = conn.execute(
+            """
+            INSERT INTO sqlite_sequence (name, seq)
+            SELECT 'payments', COALESCE(MAX(id), 0) + 1 FROM payments
+            RETURNING seq
+            """
+        ).fetchone()
+    return int(row[0])
 
 def _create_pending_order_with_conn(
     conn: sqlite3.Connection,
@@ -560,50 +479,38 @@ def _create_pending_order_with_conn(
     ):
         raise ValueError('Tariff is not available for this payment target')
 
-    tariff = None
-    if tariff_id:
-        tariff_row = conn.execute(
-            """
-            SELECT duration_days, price_minor
-            FROM tariffs
-            WHERE id = ?
-            """,
-            (int(tariff_id),),
-        ).fetchone()
-        if tariff_row is not None:
-            base_row = conn.execute(
-                "SELECT value FROM settings WHERE key = 'base_currency'"
-            ).fetchone()
-            tariff = {
-                'duration_days': int(tariff_row['duration_days'] or 0),
-                'price_minor': int(tariff_row['price_minor'] or 0),
-                'base_currency': str(base_row['value'] if base_row else 'RUB'),
-            }
-
-    cursor = conn.execute("""
+    # The id is reserved first so order_id can be written by the INSERT
+    # itself instead of a follow-up UPDATE of the new row.
+    payment_id = _reserve_payment_id(conn)
+    order_id = "00" + _int_to_base62(payment_id)
+    # Price, period and currency are read from the tariff by the INSERT
+    # itself; without a matching tariff the order is free and periodless.
+    conn.execute("""
         INSERT INTO payments
-        (user_id, tariff_id, order_id, payment_type, vpn_key_id,
+        (id, user_id, tariff_id, order_id, payment_type, vpn_key_id,
          amount_cents, amount_stars, period_days, status, paid_at,
          base_currency, nominal_amount_minor, payable_amount_minor,
          nominal_amount_cents, payable_amount_cents)
-        VALUES (?, ?, 'pending', ?, ?, ?, ?, ?, 'pending', NULL, ?, ?, ?, ?, ?)
+        SELECT ?, ?, ?, ?, ?, ?, price, 0, period, 'pending', NULL,
+               currency, price, price, price, price
+        FROM (
+            SELECT
+                COALESCE(t.price_minor, 0) AS price,
+                CASE WHEN t.id IS NOT NULL THEN COALESCE(t.duration_days, 0) END AS period,
+                CASE
+                    WHEN t.id IS NOT NULL THEN COALESCE(
+                        (SELECT value FROM settings WHERE key = 'base_currency'),
+                        'RUB'
+                    )
+                    ELSE 'RUB'
+                END AS currency
+            FROM (SELECT 1)
+            LEFT JOIN tariffs t ON t.id = ?
+        )
     """, (
-        user_id, tariff_id, payment_type, vpn_key_id,
-        int(tariff['price_minor'] or 0) if tariff else 0,
-        0,
-        tariff['duration_days'] if tariff else None,
-        str(tariff.get('base_currency') or 'RUB') if tariff else 'RUB',
-        int(tariff['price_minor'] or 0) if tariff else 0,
-        int(tariff['price_minor'] or 0) if tariff else 0,
-        int(tariff['price_minor'] or 0) if tariff else 0,
-        int(tariff['price_minor'] or 0) if tariff else 0,
+        payment_id, user_id, tariff_id, order_id, payment_type, vpn_key_id,
+        int(tariff_id) if tariff_id else None,
     ))
-    payment_id = int(cursor.lastrowid)
-    order_id = "00" + _int_to_base62(payment_id)
-    conn.execute(
-        "UPDATE payments SET order_id = ? WHERE id = ?",
-        (order_id, payment_id),
-    )
     logger.info(
         "Создан pending order: %s (id=%s, user=%s, type=%s)",
         order_id,
@@ -688,10 +595,10 @@ def create_paid_order_external(
                 user_id, tariff_id, order_id, payment_type,
                 amount_cents, amount_stars, period_days
             ))
-            logger.info(f"Создан external pending order: {order_id} (user={user_id})")
+            logger.info("Создан external pending order: %s (user=%s)", order_id, user_id)
             return True
     except Exception as e:
-        logger.error(f"Ошибка создания external order {order_id}: {e}")
+        logger.error("Ошибка создания external order %s: %s", order_id, e)
         return False
 
 def find_order_by_order_id(order_id: str) -> Optional[Dict[str, Any]]:
@@ -878,7 +785,7 @@ def update_order_tariff(order_id: str, tariff_id: int, payment_type: Optional[st
         ))
         success = cursor.rowcount > 0
         if success:
-            logger.info(f"Order {order_id} обновлен на тариф {tariff_id} (тип: {payment_type})")
+            logger.info("Order %s обновлен на тариф %s (тип: %s)", order_id, tariff_id, payment_type)
         return success
 
 def update_payment_type(order_id: str, payment_type: str) -> bool:
@@ -900,7 +807,7 @@ def update_payment_type(order_id: str, payment_type: str) -> bool:
         """, (payment_type, order_id))
         success = cursor.rowcount > 0
         if success:
-             logger.info(f"Order {order_id} тип оплаты обновлен на {payment_type}")
+             logger.info("Order %s тип оплаты обновлен на %s", order_id, payment_type)
         return success
 
 def update_payment_key_id(order_id: str, vpn_key_id: int) -> bool:
@@ -922,6 +829,45 @@ def update_payment_key_id(order_id: str, vpn_key_id: int) -> bool:
         """, (vpn_key_id, order_id))
         return cursor.rowcount > 0
 
+def create_order_draft_key(
+    order_id: str,
+    user_id: int,
+    tariff_id: int,
+    days: int,
+    traffic_limit: int = 0,
+) -> int:
+    """
+    Creates the draft key of a paid order and links it to the payment.
+
+    Both writes share one transaction, so a crash cannot leave a draft key
+    that no payment points to.
+
+    Args:
+        order_id: Order ID
+        user_id: User ID
+        tariff_id: Tariff ID
+        days: Validity period (days)
+        traffic_limit: Traffic limit in bytes (0 = unlimited)
+
+    Returns:
+        Created key ID
+    """
+    from .db_keys import _create_initial_vpn_key_with_conn
+
+    with get_db_tx() as conn:
+        key_id = _create_initial_vpn_key_with_conn(
+            conn,
+            user_id,
+            tariff_id,
+            days,
+            traffic_limit,
+        )
+        conn.execute(
+            "UPDATE payments SET vpn_key_id = ? WHERE order_id = ?",
+            (key_id, order_id),
+        )
+        return key_id
+
 def is_order_already_paid(order_id: str) -> bool:
     """
     Checks whether the order has already been paid.
@@ -934,11 +880,10 @@ def is_order_already_paid(order_id: str) -> bool:
     """
     with get_db() as conn:
         cursor = conn.execute(
-            "SELECT status FROM payments WHERE order_id = ?",
+            "SELECT EXISTS(SELECT 1 FROM payments WHERE order_id = ? AND status = 'paid')",
             (order_id,)
         )
-        row = cursor.fetchone()
-        return row and row['status'] == 'paid'
+        return bool(cursor.fetchone()[0])
 
 def get_key_payments_history(key_id: int) -> List[Dict[str, Any]]:
     """
@@ -955,13 +900,18 @@ def get_key_payments_history(key_id: int) -> List[Dict[str, Any]]:
 
         create_business_operation_tables(conn)
         cursor = conn.execute("""
-            SELECT p.*, t.name as tariff_name, t.price_rub, 'payment' AS history_type
+            SELECT p.*, 'payment' AS history_type
             FROM payments p
-            LEFT JOIN tariffs t ON p.tariff_id = t.id
             WHERE p.vpn_key_id = ? AND p.status = 'paid'
             ORDER BY p.paid_at DESC
         """, (key_id,))
-        rows = [dict(row) for row in cursor.fetchall()]
+        rows = fetchall_dicts(cursor)
+    # Tariff names come from the in-process tariff cache instead of a JOIN.
+    tariffs = _get_tariffs_cache()
+    for row in rows:
+        tariff = tariffs.get(row['tariff_id'])
+        row['tariff_name'] = tariff['name'] if tariff else None
+        row['price_rub'] = tariff['price_rub'] if tariff else None
     rows.extend(get_key_operation_history(key_id))
     return _sort_key_history_rows(rows)
 
@@ -980,7 +930,7 @@ def get_referral_levels() -> List[Dict[str, Any]]:
         cursor = conn.execute(
             "SELECT level_number, percent, enabled FROM referral_levels ORDER BY level_number"
         )
-        return [dict(row) for row in cursor.fetchall()]
+        return fetchall_dicts(cursor)
 
 def get_active_referral_levels() -> List[tuple]:
     """
@@ -1014,7 +964,7 @@ def update_referral_level(level_number: int, percent: int, enabled: bool) -> boo
         )
         success = cursor.rowcount > 0
         if success:
-            logger.info(f"Уровень {level_number} обновлён: {percent}%, enabled={enabled}")
+            logger.info("Уровень %s обновлён: %s%%, enabled=%s", level_number, percent, enabled)
         return success
 
 def get_referral_stats(user_id: int) -> List[Dict[str, Any]]:
@@ -1031,7 +981,7 @@ def get_referral_stats(user_id: int) -> List[Dict[str, Any]]:
         cursor = conn.execute(
             "SELECT level_number FROM referral_levels WHERE enabled = 1 ORDER BY level_number"
         )
-        active_levels = [row['level_number'] for row in cursor.fetchall()]
+        active_levels = fetchall_column(cursor)
         if not active_levels:
             return []
 
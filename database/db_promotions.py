@@ -4,7 +4,7 @@ import re
 import secrets
 from typing import Any, Dict, List, Optional
 
-from .connection import get_db
+from .connection import fetchall_dicts, get_db, get_db_tx
 from .db_settings import get_setting, set_setting
 
 logger = logging.getLogger(__name__)
@@ -282,7 +282,7 @@ def get_promo_codes(code_type: Optional[str] = None, *, include_inactive: bool =
     sql += " GROUP BY pc.id ORDER BY pc.created_at DESC, pc.id DESC"
 
     with get_db() as conn:
-        return [dict(row) for row in conn.execute(sql, params).fetchall()]
+        return fetchall_dicts(conn.execute(sql, params))
 
 
 def _usage_count_for_limit(
@@ -302,15 +302,14 @@ def _usage_count_for_limit(
     if exclude_reserved_user_id is not None:
         conditions.append("NOT (status = 'reserved' AND user_id = ?)")
         params.append(int(exclude_reserved_user_id))
-    row = conn.execute(
+    return conn.execute(
         f"""
-        SELECT COUNT(*) AS cnt
+        SELECT COUNT(*)
         FROM promo_redemptions
         WHERE {' AND '.join(conditions)}
         """,
         params,
-    ).fetchone()
-    return int(row["cnt"] if row else 0)
+    ).fetchone()[0]
 
 
 def _user_redemption_status(
@@ -650,8 +649,7 @@ def reserve_promo_for_order(
     final_amount: int,
     amount_unit: str,
 ) -> Dict[str, Any]:
-    with get_db() as conn:
-        conn.execute("BEGIN IMMEDIATE")
+    with get_db_tx() as conn:
         existing_reservation = conn.execute(
             """
             SELECT *
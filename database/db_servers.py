@@ -4,7 +4,8 @@ import secrets
 import string
 import datetime
 from typing import Optional, List, Dict, Any, Tuple
-from .connection import get_db
+from ._cache import TableCache
+from .connection import get_db, update_by_id_sql
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +20,7 @@ __all__ = [
     'update_server_panel_info',
     'delete_server',
     'toggle_server_active',
+    'invalidate_servers_cache',
 ]
 
 SERVER_SELECT_FIELDS = """
@@ -26,6 +28,39 @@ SERVER_SELECT_FIELDS = """
     api_token, panel_version, panel_api_profile, panel_checked_at
 """
 
+# Built once at import so the sqlite3 statement cache sees the same SQL text.
+_SELECT_ALL_SERVERS_SQL = (
+    "SELECT " + SERVER_SELECT_FIELDS + " FROM servers ORDER BY id"
+)
+
+def _load_servers() -> Dict[int, Dict[str, Any]]:
+    """Reads the whole servers table keyed by id."""
+    with get_db() as conn:
+        rows = conn.execute(_SELECT_ALL_SERVERS_SQL).fetchall()
+    return {row['id']: dict(row) for row in rows}
+
+
+# In-process copy of the servers table keyed by id, in id order. Servers are
+# looked up before every panel API call but only change from the admin panel,
+# so every writer of the table must call invalidate_servers_cache().
+_SERVERS_CACHE: TableCache[Dict[int, Dict[str, Any]]] = TableCache(_load_servers)
+
+
+def invalidate_servers_cache() -> None:
+    """Drops the cached servers so the next read reloads the table."""
+    _SERVERS_CACHE.invalidate()
+
+
+def invalidates_servers_cache(func):
+    """Decorates a function that writes the servers table."""
+    return _SERVERS_CACHE.invalidates(func)
+
+
+def _get_servers_cache() -> Dict[int, Dict[str, Any]]:
+    """Returns the cached servers, loading the table on a miss."""
+    return _SERVERS_CACHE.get()
+
+
 def get_all_servers() -> List[Dict[str, Any]]:
     """
     Gets a list of all VPN servers.
@@ -33,13 +68,8 @@ def get_all_servers() -> List[Dict[str, Any]]:
     Returns:
         List of dictionaries with server data
     """
-    with get_db() as conn:
-        cursor = conn.execute("""
-            SELECT """ + SERVER_SELECT_FIELDS + """
-            FROM servers
-            ORDER BY id
-        """)
-        return [dict(row) for row in cursor.fetchall()]
+    # Callers may modify the returned dicts, so hand out copies.
+    return [dict(server) for server in _get_servers_cache().values()]
 
 def get_server_by_id(server_id: int) -> Optional[Dict[str, Any]]:
     """
@@ -51,14 +81,13 @@ def get_server_by_id(server_id: int) -> Optional[Dict[str, Any]]:
     Returns:
         Dictionary with server data or None
     """
-    with get_db() as conn:
-        cursor = conn.execute("""
-            SELECT """ + SERVER_SELECT_FIELDS + """
-            FROM servers
-            WHERE id = ?
-        """, (server_id,))
-        row = cursor.fetchone()
-        return dict(row) if row else None
+    try:
+        # SQLite compared ids with type affinity, so '5' used to match 5.
+        server_id = int(server_id)
+    except (TypeError, ValueError):
+        return None
+    server = _get_servers_cache().get(server_id)
+    return dict(server) if server else None
 
 def get_active_servers() -> List[Dict[str, Any]]:
     """
@@ -67,15 +96,13 @@ def get_active_servers() -> List[Dict[str, Any]]:
     Returns:
         List of dictionaries with data from active servers
     """
-    with get_db() as conn:
-        cursor = conn.execute("""
-            SELECT """ + SERVER_SELECT_FIELDS + """
-            FROM servers
-            WHERE is_active = 1
-            ORDER BY id
-        """)
-        return [dict(row) for row in cursor.fetchall()]
+    return [
+        dict(server)
+        for server in _get_servers_cache().values()
+        if server['is_active']
+    ]
 
+@invalidates_servers_cache
 def add_server(
     name: str,
     host: str,
@@ -134,6 +161,7 @@ def add_server(
         logger.info(f"Добавлен сервер: {name} (ID: {server_id}, группа: {group_id})")
         return server_id
 
+@invalidates_servers_cache
 def update_server(server_id: int, **fields) -> bool:
     """
     Updates server fields.
@@ -155,20 +183,17 @@ def update_server(server_id: int, **fields) -> bool:
     if not fields:
         return False
     
-    set_clause = ", ".join(f"{k} = ?" for k in fields.keys())
-    values = list(fields.values()) + [server_id]
+    columns = tuple(sorted(fields))
+    values = [fields[column] for column in columns] + [server_id]
     
     with get_db() as conn:
-        cursor = conn.execute(f"""
-            UPDATE servers
-            SET {set_clause}
-            WHERE id = ?
-        """, values)
+        cursor = conn.execute(update_by_id_sql('servers', columns), values)
         success = cursor.rowcount > 0
         if success:
             logger.info(f"Обновлён сервер ID {server_id}: {list(fields.keys())}")
         return success
 
+@invalidates_servers_cache
 def update_server_api_token(server_id: int, token: Optional[str]) -> bool:
     """
     Atomically updates the server's Bearer token (3x-ui v3.0+).
@@ -198,6 +223,7 @@ def update_server_api_token(server_id: int, token: Optional[str]) -> bool:
         return success
 
 
+@invalidates_servers_cache
 def update_server_panel_info(
     server_id: int,
     version: Optional[str],
@@ -249,6 +275,7 @@ def update_server_field(server_id: int, field: str, value: Any) -> bool:
     """
     return update_server(server_id, **{field: value})
 
+@invalidates_servers_cache
 def delete_server(server_id: int) -> bool:
     """
     Deletes the server.
@@ -269,6 +296,7 @@ def delete_server(server_id: int) -> bool:
             logger.info(f"Удалён сервер ID {server_id}")
         return success
 
+@invalidates_servers_cache
 def toggle_server_active(server_id: int) -> Optional[bool]:
     """
     Toggles server activity.
@@ -279,17 +307,15 @@ def toggle_server_active(server_id: int) -> Optional[bool]:
     Returns:
         New status (True = active) or None if the server is not found
     """
-    server = get_server_by_id(server_id)
-    if not server:
-        return None
-    
-    new_status = 0 if server['is_active'] else 1
-    
     with get_db() as conn:
-        conn.execute("""
+        row = conn.execute("""
             UPDATE servers
-            SET is_active = ?
+            SET is_active = CASE WHEN is_active THEN 0 ELSE 1 END
             WHERE id = ?
-        """, (new_status, server_id))
+            RETURNING is_active
+        """, (server_id,)).fetchone()
+        if row is None:
+            return None
+        new_status = row[0]
         logger.info(f"Сервер ID {server_id}: is_active = {new_status}")
         return bool(new_status)
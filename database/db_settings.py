@@ -7,6 +7,7 @@ import datetime
 import re
 from decimal import Decimal, InvalidOperation
 from typing import Optional, List, Dict, Any, Tuple
+from ._cache import TableCache
 from .connection import get_db
 
 logger = logging.getLogger(__name__)
@@ -15,6 +16,7 @@ __all__ = [
     'get_setting',
     'set_setting',
     'delete_setting',
+    'invalidate_settings_cache',
     'is_update_notifications_enabled',
     'get_expired_key_retention_days',
     'is_expired_key_deletion_notifications_enabled',
@@ -80,6 +82,33 @@ _TIMEZONE_ALIASES = {
 }
 _UTC_OFFSET_RE = re.compile(r'^(?:utc|gmt)?\s*([+-])\s*(\d{1,2})(?::?(\d{2}))?$')
 
+_MISSING = object()
+
+
+def _load_settings() -> Dict[str, Optional[str]]:
+    """Reads the whole settings table."""
+    with get_db() as conn:
+        rows = conn.execute("SELECT key, value FROM settings").fetchall()
+    return {row['key']: row['value'] for row in rows}
+
+
+# In-process copy of the settings table. Settings change rarely but are read
+# on every update, so get_setting serves them from a dict. Every code path that
+# writes the table outside set_setting/delete_setting must call
+# invalidate_settings_cache() after its transaction commits.
+_SETTINGS_CACHE: TableCache[Dict[str, Optional[str]]] = TableCache(_load_settings)
+
+
+def invalidate_settings_cache() -> None:
+    """Drops the cached settings so the next read reloads the table."""
+    _SETTINGS_CACHE.invalidate()
+
+
+def invalidates_settings_cache(func):
+    """Decorates a function that writes the settings table directly."""
+    return _SETTINGS_CACHE.invalidates(func)
+
+
 def get_setting(key: str, default: Optional[str] = None) -> Optional[str]:
     """
     Gets the setting value.
@@ -91,13 +120,8 @@ def get_setting(key: str, default: Optional[str] = None) -> Optional[str]:
     Returns:
         Setting value or default
     """
-    with get_db() as conn:
-        cursor = conn.execute(
-            "SELECT value FROM settings WHERE key = ?",
-            (key,)
-        )
-        row = cursor.fetchone()
-        return row['value'] if row else default
+    value = _SETTINGS_CACHE.get().get(key, _MISSING)
+    return default if value is _MISSING else value
 
 def set_setting(key: str, value: str) -> None:
     """
@@ -137,7 +161,8 @@ def set_setting(key: str, value: str) -> None:
                         """,
                         (target, rendered or '0'),
                     )
-        logger.info(f"Настройка обновлена: {key}")
+    invalidate_settings_cache()
+    logger.info(f"Настройка обновлена: {key}")
 
 def delete_setting(key: str) -> bool:
     """
@@ -151,7 +176,9 @@ def delete_setting(key: str) -> bool:
     """
     with get_db() as conn:
         cursor = conn.execute("DELETE FROM settings WHERE key = ?", (key,))
-        return cursor.rowcount > 0
+        deleted = cursor.rowcount > 0
+    invalidate_settings_cache()
+    return deleted
 
 
 def is_update_notifications_enabled() -> bool:
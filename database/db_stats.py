@@ -5,8 +5,16 @@ import string
 import datetime
 import json
 from collections.abc import Iterable
+from functools import lru_cache
 from typing import Optional, List, Dict, Any, Tuple
-from .connection import get_db
+from .connection import (
+    fetchall_column,
+    fetchall_dicts,
+    get_db,
+    get_db_read,
+    sqlite_utc_text,
+    utc_now,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -25,10 +33,14 @@ __all__ = [
     'encode_broadcast_filters',
     'normalize_broadcast_filters',
     'get_users_for_broadcast',
+    'get_broadcast_max_user_id',
+    'fetch_broadcast_batch',
     'count_users_for_broadcast',
     'get_expiring_keys',
+    'get_expiring_keys_needing_notification',
     'is_notification_sent_today',
     'log_notification_sent',
+    'log_notifications_sent_bulk',
     'get_keys_stats',
 ]
 
@@ -90,10 +102,13 @@ def encode_broadcast_filters(value: object) -> str:
     )
 
 
-def _broadcast_recipient_query_parts(
-    filters: object,
-) -> tuple[list[str], tuple[object, ...]]:
-    selected = normalize_broadcast_filters(filters)
+def _broadcast_recipient_where_sql(filters: object) -> str:
+    return _broadcast_where_sql(normalize_broadcast_filters(filters))
+
+
+@lru_cache(maxsize=None)
+def _broadcast_where_sql(selected: tuple[str, ...]) -> str:
+    """Builds the WHERE clause once per canonical filter selection."""
     conditions = [
         'u.is_banned = 0',
         'u.is_bot_blocked = 0',
@@ -174,7 +189,7 @@ def _broadcast_recipient_query_parts(
     if 'used_trial' in selected:
         conditions.append('COALESCE(u.used_trial, 0) = 1')
 
-    return conditions, ()
+    return ' AND '.join(conditions)
 
 
 def get_users_for_broadcast(filters: object = ()) -> List[int]:
@@ -189,17 +204,62 @@ def get_users_for_broadcast(filters: object = ()) -> List[int]:
         List of telegram_id users
     """
     try:
-        conditions, params = _broadcast_recipient_query_parts(filters)
+        where_sql = _broadcast_recipient_where_sql(filters)
     except BroadcastFilterError as error:
         logger.error('Broadcast recipient selection rejected: %s', error)
         return []
 
-    with get_db() as conn:
-        cursor = conn.execute(
-            'SELECT u.telegram_id FROM users u WHERE ' + ' AND '.join(conditions),
-            params,
-        )
-        return [row['telegram_id'] for row in cursor.fetchall()]
+    with get_db_read() as conn:
+        cursor = conn.execute('SELECT u.telegram_id FROM users u WHERE ' + where_sql)
+        return fetchall_column(cursor)
+
+
+def get_broadcast_max_user_id() -> int:
+    """
+    Returns the highest users.id, the upper bound of one broadcast run.
+
+    Users who register after this is read are not included in the run.
+    """
+    with get_db_read() as conn:
+        return conn.execute('SELECT COALESCE(MAX(id), 0) FROM users').fetchone()[0]
+
+
+def fetch_broadcast_batch(
+    filters: object,
+    last_id: int,
+    max_id: int,
+    batch_size: int = 1000,
+) -> List[Tuple[int, int]]:
+    """
+    Reads the next batch of broadcast recipients after ``last_id``.
+
+    Each batch is a separate short read keyed on ``users.id``, so no read
+    transaction stays open while the caller is sending messages.
+
+    Args:
+        filters: Filter keys accepted by :func:`get_users_for_broadcast`.
+        last_id: users.id of the last recipient already read (0 to start)
+        max_id: Upper bound from :func:`get_broadcast_max_user_id`
+        batch_size: Number of rows fetched per query
+
+    Returns:
+        (users.id, telegram_id) pairs in user id order; empty when done
+    """
+    try:
+        where_sql = _broadcast_recipient_where_sql(filters)
+    except BroadcastFilterError as error:
+        logger.error('Broadcast recipient selection rejected: %s', error)
+        return []
+
+    sql = (
+        'SELECT u.id, u.telegram_id FROM users u WHERE '
+        + where_sql
+        + ' AND u.id > ? AND u.id <= ? ORDER BY u.id LIMIT ?'
+    )
+    with get_db_read() as conn:
+        cursor = conn.execute(sql, (last_id, max_id, batch_size))
+        cursor.row_factory = None
+        return cursor.fetchall()
 
 
 def count_users_for_broadcast(filters: object = ()) -> int:
@@ -213,17 +273,42 @@ def count_users_for_broadcast(filters: object = ()) -> int:
         Number of users
     """
     try:
-        conditions, params = _broadcast_recipient_query_parts(filters)
+        where_sql = _broadcast_recipient_where_sql(filters)
     except BroadcastFilterError as error:
         logger.error('Broadcast recipient selection rejected: %s', error)
         return 0
 
-    with get_db() as conn:
-        row = conn.execute(
-            'SELECT COUNT(*) AS cnt FROM users u WHERE ' + ' AND '.join(conditions),
-            params,
-        ).fetchone()
-        return int(row['cnt'] if row else 0)
+    with get_db_read() as conn:
+        return conn.execute(
+            'SELECT COUNT(*) FROM users u WHERE ' + where_sql
+        ).fetchone()[0]
+
+_EXPIRING_KEYS_SQL = """
+    SELECT
+        vk.id as vpn_key_id,
+        u.telegram_id as user_telegram_id,
+        vk.expires_at,
+        vk.custom_name,
+        CAST((julianday(vk.expires_at) - julianday('now')) AS INTEGER) as days_left
+    FROM vpn_keys vk
+    JOIN users u ON vk.user_id = u.id
+    WHERE u.is_banned = 0
+    AND u.is_bot_blocked = 0
+    AND vk.expires_at IS NOT NULL
+    AND vk.expires_at > ?
+    AND vk.expires_at <= ?
+"""
+
+_UNIX_EPOCH_DATE = datetime.date(1970, 1, 1)
+
+def _utc_day_number() -> int:
+    """Current UTC date as days since 1970-01-01, the notification_log.sent_at format."""
+    return (utc_now().date() - _UNIX_EPOCH_DATE).days
+
+def _expiring_keys_params(days: int) -> Tuple[str, str]:
+    """Binds "now" and the upper bound once so both range limits are plain strings."""
+    now = utc_now()
+    return sqlite_utc_text(now), sqlite_utc_text(now + datetime.timedelta(days=int(days)))
 
 def get_expiring_keys(days: int) -> List[Dict[str, Any]]:
     """
@@ -235,23 +320,32 @@ def get_expiring_keys(days: int) -> List[Dict[str, Any]]:
     Returns:
         List of dictionaries: vpn_key_id, user_telegram_id, expires_at, custom_name, days_left
     """
-    with get_db() as conn:
-        cursor = conn.execute("""
-            SELECT 
-                vk.id as vpn_key_id,
-                u.telegram_id as user_telegram_id,
-                vk.expires_at,
-                vk.custom_name,
-                CAST((julianday(vk.expires_at) - julianday('now')) AS INTEGER) as days_left
-            FROM vpn_keys vk
-            JOIN users u ON vk.user_id = u.id
-            WHERE u.is_banned = 0
-            AND u.is_bot_blocked = 0
-            AND vk.expires_at IS NOT NULL
-            AND vk.expires_at > datetime('now')
-            AND vk.expires_at <= datetime('now', '+' || ? || ' days')
-        """, (days,))
-        return [dict(row) for row in cursor.fetchall()]
+    with get_db_read() as conn:
+        cursor = conn.execute(_EXPIRING_KEYS_SQL, _expiring_keys_params(days))
+        return fetchall_dicts(cursor)
+
+def get_expiring_keys_needing_notification(days: int) -> List[Dict[str, Any]]:
+    """
+    Retrieves expiring keys that have not been notified about today.
+
+    Same rows as get_expiring_keys, with the notification_log check done in
+    the query instead of one is_notification_sent_today call per key.
+
+    Args:
+        days: Number of days until expiration
+
+    Returns:
+        List of dictionaries: vpn_key_id, user_telegram_id, expires_at, custom_name, days_left
+    """
+    params = _expiring_keys_params(days)
+    with get_db_read() as conn:
+        cursor = conn.execute(_EXPIRING_KEYS_SQL + """
+            AND NOT EXISTS (
+                SELECT 1 FROM notification_log nl
+                WHERE nl.vpn_key_id = vk.id AND nl.sent_at = ?
+            )
+        """, (*params, _utc_day_number()))
+        return fetchall_dicts(cursor)
 
 def is_notification_sent_today(vpn_key_id: int) -> bool:
     """
@@ -266,8 +360,8 @@ def is_notification_sent_today(vpn_key_id: int) -> bool:
     with get_db() as conn:
         cursor = conn.execute("""
             SELECT 1 FROM notification_log
-            WHERE vpn_key_id = ? AND sent_at = date('now')
-        """, (vpn_key_id,))
+            WHERE vpn_key_id = ? AND sent_at = ?
+        """, (vpn_key_id, _utc_day_number()))
         return cursor.fetchone() is not None
 
 def log_notification_sent(vpn_key_id: int) -> None:
@@ -280,10 +374,28 @@ def log_notification_sent(vpn_key_id: int) -> None:
     with get_db() as conn:
         conn.execute("""
             INSERT OR IGNORE INTO notification_log (vpn_key_id, sent_at)
-            VALUES (?, date('now'))
-        """, (vpn_key_id,))
+            VALUES (?, ?)
+        """, (vpn_key_id, _utc_day_number()))
         logger.debug(f"Записано уведомление для ключа {vpn_key_id}")
 
+def log_notifications_sent_bulk(vpn_key_ids: Iterable[int]) -> None:
+    """
+    Records sent notifications for several keys in one transaction.
+    
+    Args:
+        vpn_key_ids: VPN key IDs
+    """
+    today = _utc_day_number()
+    rows = [(int(vpn_key_id), today) for vpn_key_id in vpn_key_ids]
+    if not rows:
+        return
+    with get_db() as conn:
+        conn.executemany("""
+            INSERT OR IGNORE INTO notification_log (vpn_key_id, sent_at)
+            VALUES (?, ?)
+        """, rows)
+        logger.debug(f"Записано уведомлений: {len(rows)}")
+
 def get_keys_stats() -> Dict[str, int]:
     """
     Gets VPN key statistics.
@@ -295,24 +407,19 @@ def get_keys_stats() -> Dict[str, int]:
         - expired: expired
         - created_today: created in the last 24 hours
     """
-    with get_db() as conn:
-        # Total keys
-        cursor = conn.execute("SELECT COUNT(*) as cnt FROM vpn_keys")
-        total = cursor.fetchone()['cnt']
-        
-        # Active (not expired)
-        cursor = conn.execute("""
-            SELECT COUNT(*) as cnt FROM vpn_keys 
-            WHERE expires_at > datetime('now') OR expires_at IS NULL
-        """)
-        active = cursor.fetchone()['cnt']
-        
-        # Created per day
-        cursor = conn.execute("""
-            SELECT COUNT(*) as cnt FROM vpn_keys 
-            WHERE created_at >= datetime('now', '-1 day')
-        """)
-        created_today = cursor.fetchone()['cnt']
+    with get_db_read() as conn:
+        row = conn.execute("""
+            SELECT
+                COUNT(*) AS total,
+                COALESCE(SUM(CASE WHEN expires_at > datetime('now') OR expires_at IS NULL
+                                  THEN 1 ELSE 0 END), 0) AS active,
+                COALESCE(SUM(CASE WHEN created_at >= datetime('now', '-1 day')
+                                  THEN 1 ELSE 0 END), 0) AS created_today
+            FROM vpn_keys
+        """).fetchone()
+        total = row['total']
+        active = row['active']
+        created_today = row['created_today']
         
         return {
             'total': total,
@@ -1,7 +1,7 @@
 import logging
 from typing import Any, Dict, List, Optional
 
-from .connection import get_db
+from .connection import fetchall_dicts, get_db
 
 logger = logging.getLogger(__name__)
 
@@ -213,7 +213,7 @@ def get_support_admin_notifications(
     query += " ORDER BY id"
 
     with get_db() as conn:
-        return [dict(row) for row in conn.execute(query, params).fetchall()]
+        return fetchall_dicts(conn.execute(query, params))
 
 
 def mark_support_admin_notifications_inactive(thread_id: int, admin_telegram_ids: List[int]) -> int:
@@ -5,7 +5,8 @@ import string
 import datetime
 from decimal import Decimal, ROUND_HALF_UP
 from typing import Optional, List, Dict, Any, Tuple
-from .connection import get_db
+from ._cache import TableCache
+from .connection import get_db, update_by_id_sql
 
 logger = logging.getLogger(__name__)
 
@@ -22,11 +23,53 @@ __all__ = [
     'ensure_admin_custom_tariff',
     'is_admin_custom_tariff',
     'normalize_tariff_money',
+    'invalidate_tariffs_cache',
 ]
 
 
 ADMIN_CUSTOM_SYSTEM_TYPE = 'admin_custom'
 
+_TARIFF_SELECT_FIELDS = """
+    id, name, duration_days, price_rub, price_minor,
+    display_order, is_active, traffic_limit_gb, group_id, max_ips,
+    system_type
+"""
+
+def _load_tariffs() -> Dict[int, Dict[str, Any]]:
+    """Reads the whole tariffs table keyed by id, with normalized prices."""
+    with get_db() as conn:
+        rows = conn.execute(
+            "SELECT " + _TARIFF_SELECT_FIELDS + " FROM tariffs ORDER BY display_order, id"
+        ).fetchall()
+        base, rub_rate = _base_currency_and_rub_rate(conn)
+    return {
+        row['id']: normalize_tariff_money(row, base_currency=base, rub_rate=rub_rate)
+        for row in rows
+    }
+
+
+# In-process copy of all tariffs (hidden and system ones included), keyed by id
+# in display order and already normalized to the current base currency.
+# Tariffs are read on almost every user screen but only change from the admin
+# panel, so every writer of tariffs, tariff groups or currency rates must call
+# invalidate_tariffs_cache() after its transaction commits.
+_TARIFFS_CACHE: TableCache[Dict[int, Dict[str, Any]]] = TableCache(_load_tariffs)
+
+
+def invalidate_tariffs_cache() -> None:
+    """Drops the cached tariffs so the next read reloads the table."""
+    _TARIFFS_CACHE.invalidate()
+
+
+def invalidates_tariffs_cache(func):
+    """Decorates a function that writes tariffs or the prices they depend on."""
+    return _TARIFFS_CACHE.invalidates(func)
+
+
+def _get_tariffs_cache() -> Dict[int, Dict[str, Any]]:
+    """Returns the cached tariffs, loading the table on a miss."""
+    return _TARIFFS_CACHE.get()
+
 
 def _base_currency_and_rub_rate(conn) -> tuple[str, Decimal]:
     row = conn.execute(
@@ -77,23 +120,13 @@ def get_all_tariffs(
     Returns:
         List of dictionaries with tariff data
     """
-    with get_db() as conn:
-        conditions = []
-        if not include_hidden:
-            conditions.append("is_active = 1")
-        if not include_system:
-            conditions.append("system_type IS NULL")
-        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
-        cursor = conn.execute(f"""
-            SELECT id, name, duration_days, price_rub, price_minor,
-                   display_order, is_active, traffic_limit_gb, group_id, max_ips,
-                   system_type
-            FROM tariffs
-            {where_clause}
-            ORDER BY display_order, id
-        """)
-        base, rub_rate = _base_currency_and_rub_rate(conn)
-        return [normalize_tariff_money(dict(row), base_currency=base, rub_rate=rub_rate) for row in cursor.fetchall()]
+    # Callers may modify the returned dicts, so hand out copies.
+    return [
+        dict(tariff)
+        for tariff in _get_tariffs_cache().values()
+        if (include_hidden or tariff['is_active'] == 1)
+        and (include_system or tariff['system_type'] is None)
+    ]
 
 def get_tariff_by_id(tariff_id: int) -> Optional[Dict[str, Any]]:
     """
@@ -105,20 +138,15 @@ def get_tariff_by_id(tariff_id: int) -> Optional[Dict[str, Any]]:
     Returns:
         Dictionary with tariff data or None
     """
-    with get_db() as conn:
-        cursor = conn.execute("""
-            SELECT id, name, duration_days, price_rub, price_minor,
-                   display_order, is_active, traffic_limit_gb, group_id, max_ips,
-                   system_type
-            FROM tariffs
-            WHERE id = ?
-        """, (tariff_id,))
-        row = cursor.fetchone()
-        if not row:
-            return None
-        base, rub_rate = _base_currency_and_rub_rate(conn)
-        return normalize_tariff_money(dict(row), base_currency=base, rub_rate=rub_rate)
+    try:
+        # SQLite compared ids with type affinity, so '5' used to match 5.
+        tariff_id = int(tariff_id)
+    except (TypeError, ValueError):
+        return None
+    tariff = _get_tariffs_cache().get(tariff_id)
+    return dict(tariff) if tariff else None
 
+@invalidates_tariffs_cache
 def add_tariff(
     name: str,
     duration_days: int,
@@ -175,6 +203,7 @@ def add_tariff(
         logger.info(f"Добавлен тариф: {name} (ID: {tariff_id}, трафик: {traffic_limit_gb} ГБ, группа: {group_id}, max_ips: {max_ips})")
         return tariff_id
 
+@invalidates_tariffs_cache
 def update_tariff(tariff_id: int, **fields) -> bool:
     """
     Updates rate fields.
@@ -225,13 +254,9 @@ def update_tariff(tariff_id: int, **fields) -> bool:
             fields['price_minor'] = int(
                 (base_major * Decimal('100')).to_integral_value(rounding=ROUND_HALF_UP)
             )
-        set_clause = ", ".join(f"{k} = ?" for k in fields.keys())
-        values = list(fields.values()) + [tariff_id]
-        cursor = conn.execute(f"""
-            UPDATE tariffs
-            SET {set_clause}
-            WHERE id = ?
-        """, values)
+        columns = tuple(sorted(fields))
+        values = [fields[k] for k in columns] + [tariff_id]
+        cursor = conn.execute(update_by_id_sql('tariffs', columns), values)
         success = cursor.rowcount > 0
         if success:
             logger.info(f"Обновлён тариф ID {tariff_id}: {list(fields.keys())}")
@@ -251,6 +276,7 @@ def update_tariff_field(tariff_id: int, field: str, value: Any) -> bool:
     """
     return update_tariff(tariff_id, **{field: value})
 
+@invalidates_tariffs_cache
 def toggle_tariff_active(tariff_id: int) -> Optional[bool]:
     """
     Switches the tariff activity (hide/show).
@@ -261,18 +287,17 @@ def toggle_tariff_active(tariff_id: int) -> Optional[bool]:
     Returns:
         New status (True = active) or None if tariff not found
     """
-    tariff = get_tariff_by_id(tariff_id)
-    if not tariff or tariff.get('system_type') is not None:
-        return None
-    
-    new_status = 0 if tariff['is_active'] else 1
-    
     with get_db() as conn:
-        conn.execute("""
+        # Protected system tariffs are never toggled.
+        row = conn.execute("""
             UPDATE tariffs
-            SET is_active = ?
-            WHERE id = ?
-        """, (new_status, tariff_id))
+            SET is_active = CASE WHEN is_active THEN 0 ELSE 1 END
+            WHERE id = ? AND system_type IS NULL
+            RETURNING is_active
+        """, (tariff_id,)).fetchone()
+        if row is None:
+            return None
+        new_status = row[0]
         status_text = "активирован" if new_status else "скрыт"
         logger.info(f"Тариф ID {tariff_id}: {status_text}")
         return bool(new_status)
@@ -284,13 +309,11 @@ def get_tariffs_count() -> int:
     Returns:
         Number of active tariffs
     """
-    with get_db() as conn:
-        cursor = conn.execute(
-            "SELECT COUNT(*) as cnt FROM tariffs "
-            "WHERE is_active = 1 AND system_type IS NULL"
-        )
-        row = cursor.fetchone()
-        return row['cnt'] if row else 0
+    return sum(
+        1
+        for tariff in _get_tariffs_cache().values()
+        if tariff['is_active'] == 1 and tariff['system_type'] is None
+    )
 
 def _get_admin_custom_tariff_with_conn(
     conn: sqlite3.Connection,
@@ -319,10 +342,17 @@ def _get_admin_custom_tariff_with_conn(
 
 def get_admin_custom_tariff(group_id: int) -> Optional[Dict[str, Any]]:
     """Returns the protected custom admin tariff for one tariff group."""
-    with get_db() as conn:
-        return _get_admin_custom_tariff_with_conn(conn, group_id)
+    group_id = int(group_id)
+    for tariff in _get_tariffs_cache().values():
+        if (
+            tariff['group_id'] == group_id
+            and tariff['system_type'] == ADMIN_CUSTOM_SYSTEM_TYPE
+        ):
+            return dict(tariff)
+    return None
 
 
+@invalidates_tariffs_cache
 def ensure_admin_custom_tariff(
     group_id: int,
     *,
@@ -339,45 +369,53 @@ def ensure_admin_custom_tariff(
     ).fetchone()
     if group is None:
         raise ValueError(f"Tariff group {group_id} does not exist")
-    existing = _get_admin_custom_tariff_with_conn(conn, group_id)
-    if existing is not None:
-        return existing
 
-    cursor = conn.execute(
+    # Every caller reaches here when the tariff is most likely missing, so
+    # try the insert first; idx_tariffs_admin_custom_group turns a
+    # concurrent or pre-existing row into a no-op instead of a duplicate.
+    created = conn.execute(
         """
         INSERT INTO tariffs (
             name, duration_days, price_rub, price_minor, display_order,
             is_active, traffic_limit_gb, group_id, max_ips, system_type
         )
         VALUES (?, 0, 0, 0, 999, 0, 0, ?, 1, ?)
-        """,
+        ON CONFLICT(group_id) WHERE system_type = 'admin_custom' DO NOTHING
+        RETURNING """ + _TARIFF_SELECT_FIELDS,
         (f'Admin Custom {int(group_id)}', int(group_id), ADMIN_CUSTOM_SYSTEM_TYPE),
-    )
+    ).fetchone()
+    if created is None:
+        existing = _get_admin_custom_tariff_with_conn(conn, group_id)
+        if existing is None:
+            raise RuntimeError("Failed to create protected admin custom tariff")
+        return existing
+
     logger.info(
         "Created protected admin custom tariff for group %s (ID: %s)",
         group_id,
-        cursor.lastrowid,
+        created['id'],
+    )
+    base, rub_rate = _base_currency_and_rub_rate(conn)
+    return normalize_tariff_money(
+        dict(created),
+        base_currency=base,
+        rub_rate=rub_rate,
     )
-    created = _get_admin_custom_tariff_with_conn(conn, group_id)
-    if created is None:
-        raise RuntimeError("Failed to create protected admin custom tariff")
-    return created
 
 
 def is_admin_custom_tariff(tariff_id: int) -> bool:
     """Returns whether a tariff is the protected custom admin tariff."""
-    with get_db() as conn:
-        row = conn.execute(
-            "SELECT system_type FROM tariffs WHERE id = ?",
-            (int(tariff_id),),
-        ).fetchone()
-        return bool(
-            row and row['system_type'] == ADMIN_CUSTOM_SYSTEM_TYPE
-        )
+    tariff = _get_tariffs_cache().get(int(tariff_id))
+    return bool(
+        tariff and tariff['system_type'] == ADMIN_CUSTOM_SYSTEM_TYPE
+    )
 
 
 def get_admin_tariff(group_id: int = 1) -> Optional[Dict[str, Any]]:
     """Compatibility wrapper for the group-aware protected admin tariff."""
+    tariff = get_admin_custom_tariff(group_id)
+    if tariff is not None:
+        return tariff
     return ensure_admin_custom_tariff(group_id)
 
 
@@ -5,9 +5,10 @@ import logging
 import sqlite3
 from typing import Any
 
-from .connection import get_db
+from .connection import fetchall_dicts, get_db, get_db_tx
 from .db_keys import _create_initial_vpn_key_with_conn
 from .db_payments import _complete_order_with_conn, _create_pending_order_with_conn
+from .db_settings import invalidates_settings_cache
 
 logger = logging.getLogger(__name__)
 
@@ -84,6 +85,7 @@ def get_trial_usage_scope() -> str:
         return _scope_with_conn(conn)
 
 
+@invalidates_settings_cache
 def set_trial_usage_scope(scope: str) -> bool:
     """Sets the hidden eligibility scope after strict enum validation."""
     normalized = str(scope or '').strip().casefold()
@@ -153,10 +155,10 @@ def _get_primary_offer_with_conn(
 def get_all_trial_offers() -> list[dict[str, Any]]:
     """Returns primary and additional offers with their current tariff group."""
     with get_db() as conn:
-        rows = conn.execute(
+        cursor = conn.execute(
             _TRIAL_OFFER_SELECT + " ORDER BY o.is_primary DESC, o.id"
-        ).fetchall()
-    return [dict(row) for row in rows]
+        )
+        return fetchall_dicts(cursor)
 
 
 def get_trial_offer_by_id(offer_id: int) -> dict[str, Any] | None:
@@ -408,8 +410,7 @@ def claim_trial_offer(user_id: int, offer_id: int) -> dict[str, Any]:
     if normalized_user_id <= 0 or normalized_offer_id <= 0:
         raise ValueError('user_id and offer_id must be positive')
 
-    with get_db() as conn:
-        conn.execute('BEGIN IMMEDIATE')
+    with get_db_tx() as conn:
         user = conn.execute(
             "SELECT id FROM users WHERE id = ?",
             (normalized_user_id,),
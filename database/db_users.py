@@ -4,7 +4,7 @@ import secrets
 import string
 import datetime
 from typing import Optional, List, Dict, Any, Tuple
-from .connection import get_db
+from .connection import fetchall_dicts, get_db, get_db_read
 
 logger = logging.getLogger(__name__)
 
@@ -99,39 +99,25 @@ def get_or_create_user(
             referral_code = _generate_referral_code()
             attempts += 1
         
-        user_columns = {
-            row['name']
-            for row in conn.execute("PRAGMA table_info(users)").fetchall()
-        }
-        fields = ['telegram_id', 'username', 'referral_code']
-        values = [telegram_id, username, referral_code]
-        if 'first_name' in user_columns:
-            fields.append('first_name')
-            values.append(first_name)
-        if 'last_name' in user_columns:
-            fields.append('last_name')
-            values.append(last_name)
-
-        placeholders = ', '.join('?' for _ in fields)
-        cursor = conn.execute(
-            f"INSERT INTO users ({', '.join(fields)}) VALUES ({placeholders})",
-            values
-        )
+        row = conn.execute(
+            """
+            INSERT INTO users (telegram_id, username, first_name, last_name, referral_code)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(telegram_id) DO NOTHING
+            RETURNING *
+            """,
+            (telegram_id, username, first_name, last_name, referral_code),
+        ).fetchone()
+        if row is None:
+            # A concurrent update created the user between our SELECT and INSERT.
+            row = conn.execute(
+                "SELECT * FROM users WHERE telegram_id = ?",
+                (telegram_id,)
+            ).fetchone()
+            return dict(row), False
+
         logger.info(f"Новый пользователь: {telegram_id} (@{username}), referral_code: {referral_code}")
-        
-        return {
-            'id': cursor.lastrowid,
-            'telegram_id': telegram_id,
-            'username': username,
-            'first_name': first_name,
-            'last_name': last_name,
-            'is_banned': 0,
-            'is_bot_blocked': 0,
-            'referral_code': referral_code,
-            'referred_by': None,
-            'personal_balance': 0,
-            'referral_coefficient': 1.0
-        }, True
+        return dict(row), True
 
 def is_user_banned(telegram_id: int) -> bool:
     """
@@ -215,9 +201,7 @@ def get_all_users_count() -> int:
         Number of users
     """
     with get_db() as conn:
-        cursor = conn.execute("SELECT COUNT(*) as cnt FROM users WHERE is_banned = 0")
-        row = cursor.fetchone()
-        return row['cnt'] if row else 0
+        return conn.execute("SELECT COUNT(*) FROM users WHERE is_banned = 0").fetchone()[0]
 
 def get_users_stats() -> Dict[str, int]:
     """
@@ -231,48 +215,102 @@ def get_users_stats() -> Dict[str, int]:
         - never_paid: never purchased
         - expired: there was a key, but it expired
     """
-    with get_db() as conn:
-        def count(query: str) -> int:
-            cursor = conn.execute(query)
-            row = cursor.fetchone()
-            return row['cnt'] if row else 0
-
-        return {
-            'total': count("SELECT COUNT(*) as cnt FROM users WHERE is_banned = 0"),
-            'active': count("""
-                SELECT COUNT(DISTINCT u.id) as cnt FROM users u
-                JOIN vpn_keys vk ON u.id = vk.user_id
-                WHERE u.is_banned = 0
-                  AND (vk.expires_at > datetime('now') OR vk.expires_at IS NULL)
-            """),
-            'inactive': count("""
-                SELECT COUNT(*) as cnt FROM users u
-                WHERE u.is_banned = 0
-                AND u.id NOT IN (
-                    SELECT DISTINCT user_id FROM vpn_keys
-                    WHERE expires_at > datetime('now') OR expires_at IS NULL
-                )
-            """),
-            'never_paid': count("""
-                SELECT COUNT(*) as cnt FROM users u
-                WHERE u.is_banned = 0
-                AND u.id NOT IN (SELECT DISTINCT user_id FROM vpn_keys)
-            """),
-            'expired': count("""
-                SELECT COUNT(DISTINCT u.id) as cnt FROM users u
-                JOIN vpn_keys vk ON u.id = vk.user_id
+    with get_db_read() as conn:
+        # One pass over users: each row probes the vpn_keys(user_id, expires_at)
+        # index a few times instead of running one full scan per category.
+        row = conn.execute("""
+            SELECT
+                COUNT(*) AS total,
+                COALESCE(SUM(has_active), 0) AS active,
+                COALESCE(SUM(NOT has_active), 0) AS inactive,
+                COALESCE(SUM(NOT has_any), 0) AS never_paid,
+                COALESCE(SUM(has_expired AND NOT has_active), 0) AS expired,
+                COALESCE(SUM(is_bot_blocked = 1), 0) AS bot_blocked
+            FROM (
+                SELECT
+                    u.is_bot_blocked,
+                    EXISTS (
+                        SELECT 1 FROM vpn_keys active_key
+                        WHERE active_key.user_id = u.id
+                          AND (active_key.expires_at > datetime('now') OR active_key.expires_at IS NULL)
+                    ) AS has_active,
+                    EXISTS (
+                        SELECT 1 FROM vpn_keys any_key WHERE any_key.user_id = u.id
+                    ) AS has_any,
+                    EXISTS (
+                        SELECT 1 FROM vpn_keys expired_key
+                        WHERE expired_key.user_id = u.id
+                          AND expired_key.expires_at <= datetime('now')
+                    ) AS has_expired
+                FROM users u
                 WHERE u.is_banned = 0
-                AND vk.expires_at <= datetime('now')
-                AND u.id NOT IN (
-                    SELECT DISTINCT user_id FROM vpn_keys
-                    WHERE expires_at > datetime('now') OR expires_at IS NULL
-                )
-            """),
-            'bot_blocked': count("""
-                SELECT COUNT(*) as cnt FROM users
-                WHERE is_banned = 0 AND is_bot_blocked = 1
-            """),
-        }
+            )
+        """).fetchone()
+        return dict(row)
+
+# Base SELECT for each admin user-list filter. The page and count statements
+# below are built once at import, so every call reuses the same SQL text.
+_USER_LIST_BASE_SQL = {
+    'all': "SELECT * FROM users WHERE is_banned = 0",
+    'active': """
+        SELECT u.* FROM users u
+        WHERE u.is_banned = 0
+        AND EXISTS (
+            SELECT 1 FROM vpn_keys active_key
+            WHERE active_key.user_id = u.id
+              AND (active_key.expires_at > datetime('now') OR active_key.expires_at IS NULL)
+        )
+    """,
+    'inactive': """
+        SELECT u.* FROM users u
+        WHERE u.is_banned = 0 
+        AND NOT EXISTS (
+            SELECT 1 FROM vpn_keys active_key
+            WHERE active_key.user_id = u.id
+              AND (active_key.expires_at > datetime('now') OR active_key.expires_at IS NULL)
+        )
+    """,
+    'never_paid': """
+        SELECT u.* FROM users u
+        WHERE u.is_banned = 0 
+        AND NOT EXISTS (SELECT 1 FROM vpn_keys any_key WHERE any_key.user_id = u.id)
+    """,
+    'expired': """
+        SELECT u.* FROM users u
+        WHERE u.is_banned = 0 
+        AND EXISTS (
+            SELECT 1 FROM vpn_keys expired_key
+            WHERE expired_key.user_id = u.id
+              AND expired_key.expires_at <= datetime('now')
+        )
+        AND NOT EXISTS (
+            SELECT 1 FROM vpn_keys active_key
+            WHERE active_key.user_id = u.id
+              AND (active_key.expires_at > datetime('now') OR active_key.expires_at IS NULL)
+        )
+    """,
+    'bot_blocked': """
+        SELECT * FROM users
+        WHERE is_banned = 0 AND is_bot_blocked = 1
+    """,
+}
+
+# The page and the total come from one scan: COUNT(*) OVER() is evaluated
+# over the whole filtered set before LIMIT (SQLite 3.25+).
+_USER_LIST_PAGE_SQL = {
+    filter_type: f"""
+        SELECT page.*, COUNT(*) OVER() AS _total
+        FROM ({base_query}) AS page
+        ORDER BY page.id DESC
+        LIMIT ? OFFSET ?
+    """
+    for filter_type, base_query in _USER_LIST_BASE_SQL.items()
+}
+_USER_LIST_COUNT_SQL = {
+    filter_type: f"SELECT COUNT(*) FROM ({base_query})"
+    for filter_type, base_query in _USER_LIST_BASE_SQL.items()
+}
+
 
 def get_all_users_paginated(offset: int = 0, limit: int = 20, 
                              filter_type: str = 'all') -> tuple[List[Dict[str, Any]], int]:
@@ -287,92 +325,22 @@ def get_all_users_paginated(offset: int = 0, limit: int = 20,
     Returns:
         Tuple (list of users, total number)
     """
-    with get_db() as conn:
-        # Basic query with key data
-        if filter_type == 'all':
-            base_query = "SELECT * FROM users WHERE is_banned = 0"
-            count_query = "SELECT COUNT(*) as cnt FROM users WHERE is_banned = 0"
-        elif filter_type == 'active':
-            base_query = """
-                SELECT DISTINCT u.* FROM users u
-                JOIN vpn_keys vk ON u.id = vk.user_id
-                WHERE u.is_banned = 0
-                  AND (vk.expires_at > datetime('now') OR vk.expires_at IS NULL)
-            """
-            count_query = """
-                SELECT COUNT(DISTINCT u.id) as cnt FROM users u
-                JOIN vpn_keys vk ON u.id = vk.user_id
-                WHERE u.is_banned = 0
-                  AND (vk.expires_at > datetime('now') OR vk.expires_at IS NULL)
-            """
-        elif filter_type == 'inactive':
-            base_query = """
-                SELECT u.* FROM users u
-                WHERE u.is_banned = 0 
-                AND u.id NOT IN (
-                    SELECT DISTINCT user_id FROM vpn_keys 
-                    WHERE expires_at > datetime('now') OR expires_at IS NULL
-                )
-            """
-            count_query = """
-                SELECT COUNT(*) as cnt FROM users u
-                WHERE u.is_banned = 0 
-                AND u.id NOT IN (
-                    SELECT DISTINCT user_id FROM vpn_keys 
-                    WHERE expires_at > datetime('now') OR expires_at IS NULL
-                )
-            """
-        elif filter_type == 'never_paid':
-            base_query = """
-                SELECT u.* FROM users u
-                WHERE u.is_banned = 0 
-                AND u.id NOT IN (SELECT DISTINCT user_id FROM vpn_keys)
-            """
-            count_query = """
-                SELECT COUNT(*) as cnt FROM users u
-                WHERE u.is_banned = 0 
-                AND u.id NOT IN (SELECT DISTINCT user_id FROM vpn_keys)
-            """
-        elif filter_type == 'expired':
-            base_query = """
-                SELECT DISTINCT u.* FROM users u
-                JOIN vpn_keys vk ON u.id = vk.user_id
-                WHERE u.is_banned = 0 
-                AND vk.expires_at <= datetime('now')
-                AND u.id NOT IN (
-                    SELECT DISTINCT user_id FROM vpn_keys 
-                    WHERE expires_at > datetime('now') OR expires_at IS NULL
-                )
-            """
-            count_query = """
-                SELECT COUNT(DISTINCT u.id) as cnt FROM users u
-                JOIN vpn_keys vk ON u.id = vk.user_id
-                WHERE u.is_banned = 0 
-                AND vk.expires_at <= datetime('now')
-                AND u.id NOT IN (
-                    SELECT DISTINCT user_id FROM vpn_keys 
-                    WHERE expires_at > datetime('now') OR expires_at IS NULL
-                )
-            """
-        elif filter_type == 'bot_blocked':
-            base_query = """
-                SELECT * FROM users
-                WHERE is_banned = 0 AND is_bot_blocked = 1
-            """
-            count_query = """
-                SELECT COUNT(*) as cnt FROM users
-                WHERE is_banned = 0 AND is_bot_blocked = 1
-            """
-        else:
+    with get_db_read() as conn:
+        page_sql = _USER_LIST_PAGE_SQL.get(filter_type)
+        if page_sql is None:
             return [], 0
         
-        # We get the total quantity
-        cursor = conn.execute(count_query)
-        total = cursor.fetchone()['cnt']
-        
-        # We get the page
-        cursor = conn.execute(f"{base_query} ORDER BY id DESC LIMIT ? OFFSET ?", (limit, offset))
-        users = [dict(row) for row in cursor.fetchall()]
+        cursor = conn.execute(page_sql, (limit, offset))
+        users = fetchall_dicts(cursor)
+        if users:
+            total = users[0]['_total']
+            for user in users:
+                del user['_total']
+        elif offset > 0:
+            # Past the last page there is no row to carry the total.
+            total = conn.execute(_USER_LIST_COUNT_SQL[filter_type]).fetchone()[0]
+        else:
+            total = 0
         
         return users, total
 
@@ -435,17 +403,19 @@ def toggle_user_ban(telegram_id: int) -> Optional[bool]:
     Returns:
         New status (True = banned) or None if not found
     """
-    user = get_user_by_telegram_id(telegram_id)
-    if not user:
-        return None
-    
-    new_status = 0 if user['is_banned'] else 1
-    
     with get_db() as conn:
-        conn.execute(
-            "UPDATE users SET is_banned = ? WHERE telegram_id = ?",
-            (new_status, telegram_id)
-        )
+        row = conn.execute(
+            """
+            UPDATE users
+            SET is_banned = CASE WHEN is_banned THEN 0 ELSE 1 END
+            WHERE telegram_id = ?
+            RETURNING is_banned
+            """,
+            (telegram_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        new_status = row[0]
         status_text = "забанен" if new_status else "разбанен"
         logger.info(f"Пользователь {telegram_id}: {status_text}")
         return bool(new_status)
@@ -457,13 +427,11 @@ def get_new_users_count_today() -> int:
     Returns:
         Number of new users
     """
-    with get_db() as conn:
-        cursor = conn.execute("""
-            SELECT COUNT(*) as cnt FROM users 
+    with get_db_read() as conn:
+        return conn.execute("""
+            SELECT COUNT(*) FROM users 
             WHERE created_at >= datetime('now', '-1 day')
-        """)
-        row = cursor.fetchone()
-        return row['cnt'] if row else 0
+        """).fetchone()[0]
 
 def get_user_internal_id(telegram_id: int) -> Optional[int]:
     """
@@ -63,6 +63,8 @@ def run_candidate_migrations(project_root: Path, database_path: Path) -> int:
     from database import migrations
 
     migrations.run_migrations()
+    # Pooled connections would keep the candidate in WAL mode.
+    db_connection.close_db_pool()
     _finalize_candidate_file(candidate)
     _validate_database(candidate)
     with sqlite3.connect(str(candidate), timeout=30) as connection:
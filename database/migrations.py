@@ -19,6 +19,9 @@ from .db_stats import (
     encode_broadcast_filters,
     normalize_broadcast_filters,
 )
+from .db_servers import invalidate_servers_cache
+from .db_settings import invalidate_settings_cache
+from .db_tariffs import invalidate_tariffs_cache
 from .db_user_ui_texts import update_user_ui_text_defaults
 from .user_ui_text_catalog import USER_UI_TEXT_DEFINITIONS
 
@@ -43,7 +46,7 @@ def _add_column(conn: sqlite3.Connection, table: str, column_def: str) -> None:
 INITIAL_VERSION = 73
 
 # Current version of the database schema (incremented when new migrations are added)
-LATEST_VERSION = 97
+LATEST_VERSION = 100
 
 DEFAULT_BROADCAST_STYLE_PROFILE = {
     "schema_version": 1,
@@ -611,8 +614,11 @@ def set_version(conn: sqlite3.Connection, version: int) -> None:
         conn: Connection to the database
         version: Version number
     """
-    conn.execute("DELETE FROM schema_version")
-    conn.execute("INSERT INTO schema_version (version) VALUES (?)", (version,))
+    # The table always holds one row once created, so one UPDATE is enough;
+    # the INSERT only runs for the freshly created table.
+    cursor = conn.execute("UPDATE schema_version SET version = ?", (version,))
+    if cursor.rowcount == 0:
+        conn.execute("INSERT INTO schema_version (version) VALUES (?)", (version,))
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -715,8 +721,10 @@ def migration_initial(conn: sqlite3.Connection) -> None:
         # Existing installations reached v73 before this baseline was compressed.
         ('bot_mode', 'subscription'),
     ]
-    for key, value in default_settings:
-        conn.execute("INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)", (key, value))
+    conn.executemany(
+        "INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)",
+        default_settings,
+    )
 
     # ── users ─────────────────────────────────────────────────────────────────
 
@@ -738,7 +746,6 @@ def migration_initial(conn: sqlite3.Connection) -> None:
             active_promo_code_id INTEGER
         )
     """)
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_telegram_id ON users(telegram_id)")
     conn.execute("CREATE INDEX IF NOT EXISTS idx_users_is_bot_blocked ON users(is_bot_blocked)")
     conn.execute("CREATE INDEX IF NOT EXISTS idx_users_referral_code ON users(referral_code)")
     conn.execute("CREATE INDEX IF NOT EXISTS idx_users_referred_by ON users(referred_by)")
@@ -875,7 +882,6 @@ def migration_initial(conn: sqlite3.Connection) -> None:
             FOREIGN KEY (tariff_id) REFERENCES tariffs(id)
         )
     """)
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_vpn_keys_user_id ON vpn_keys(user_id)")
     conn.execute("CREATE INDEX IF NOT EXISTS idx_vpn_keys_expires_at ON vpn_keys(expires_at)")
     conn.execute("CREATE INDEX IF NOT EXISTS idx_vpn_keys_user_expires ON vpn_keys(user_id, expires_at DESC)")
     conn.execute("CREATE INDEX IF NOT EXISTS idx_vpn_keys_server_email ON vpn_keys(server_id, panel_email)")
@@ -918,7 +924,6 @@ def migration_initial(conn: sqlite3.Connection) -> None:
     """)
     conn.execute("CREATE INDEX IF NOT EXISTS idx_payments_user_id ON payments(user_id)")
     conn.execute("CREATE INDEX IF NOT EXISTS idx_payments_paid_at ON payments(paid_at)")
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_payments_order_id ON payments(order_id)")
     conn.execute("CREATE INDEX IF NOT EXISTS idx_payments_yookassa_payment_id ON payments(yookassa_payment_id)")
     conn.execute("CREATE INDEX IF NOT EXISTS idx_payments_wata_link_id ON payments(wata_link_id)")
     conn.execute("CREATE INDEX IF NOT EXISTS idx_payments_platega_transaction_id ON payments(platega_transaction_id)")
@@ -968,7 +973,6 @@ def migration_initial(conn: sqlite3.Connection) -> None:
         )
     """)
     conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_notification_log_unique ON notification_log(vpn_key_id, sent_at)")
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_notification_log_vpn_key ON notification_log(vpn_key_id)")
 
     # ── referral_levels ───────────────────────────────────────────────────────
 
@@ -1446,11 +1450,13 @@ def migration_initial(conn: sqlite3.Connection) -> None:
         },
     })
 
-    for page_key, data in page_defaults.items():
-        conn.execute(
-            "INSERT OR IGNORE INTO pages (page_key, text_default, buttons_default) VALUES (?, ?, ?)",
+    conn.executemany(
+        "INSERT OR IGNORE INTO pages (page_key, text_default, buttons_default) VALUES (?, ?, ?)",
+        (
             (page_key, data['text'], data['buttons'])
-        )
+            for page_key, data in page_defaults.items()
+        ),
+    )
 
     # ── page routes ───────────────────────────────────────────────────────────
 
@@ -1544,11 +1550,10 @@ def migration_75(conn: sqlite3.Connection) -> None:
         ),
         ("broadcast_config_revision", "0"),
     )
-    for key, value in defaults:
-        conn.execute(
-            "INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)",
-            (key, value),
-        )
+    conn.executemany(
+        "INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)",
+        defaults,
+    )
     logger.info("Migration v75 applied: broadcast editor settings ready")
 
 
@@ -4794,6 +4799,76 @@ def migration_97(conn: sqlite3.Connection) -> None:
     )
 
 
+def migration_98(conn: sqlite3.Connection) -> None:
+    """Migration v98: drop single-column indexes shadowed by composite ones."""
+    # idx_vpn_keys_user_expires (user_id, expires_at) and
+    # idx_notification_log_unique (vpn_key_id, sent_at) already serve every
+    # lookup on their leading column, including foreign-key checks.
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_vpn_keys_user_expires "
+        "ON vpn_keys(user_id, expires_at DESC)"
+    )
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_notification_log_unique "
+        "ON notification_log(vpn_key_id, sent_at)"
+    )
+    conn.execute("DROP INDEX IF EXISTS idx_vpn_keys_user_id")
+    conn.execute("DROP INDEX IF EXISTS idx_notification_log_vpn_key")
+    logger.info(
+        "Migration v98 applied: redundant vpn_keys and notification_log "
+        "indexes dropped"
+    )
+
+
+def migration_99(conn: sqlite3.Connection) -> None:
+    """Migration v99: store notification_log.sent_at as a UTC day number."""
+    # Days since 1970-01-01 (UTC). Rows whose date cannot be parsed only
+    # guarded a past day's notification and are dropped.
+    conn.execute(
+        """
+        DELETE FROM notification_log
+        WHERE typeof(sent_at) = 'text' AND julianday(sent_at) IS NULL
+        """
+    )
+    conn.execute(
+        """
+        UPDATE notification_log
+        SET sent_at = CAST(julianday(sent_at) - 2440587.5 AS INTEGER)
+        WHERE typeof(sent_at) = 'text'
+        """
+    )
+    logger.info("Migration v99 applied: notification_log.sent_at stored as day numbers")
+
+
+def _has_unique_index_on(conn: sqlite3.Connection, table: str, column: str) -> bool:
+    """Returns whether a unique index covers exactly one column of the table."""
+    for index in conn.execute(f"PRAGMA index_list({table})").fetchall():
+        if not index["unique"] or index["partial"]:
+            continue
+        columns = [
+            row["name"]
+            for row in conn.execute(f'PRAGMA index_info("{index["name"]}")').fetchall()
+        ]
+        if columns == [column]:
+            return True
+    return False
+
+
+def migration_100(conn: sqlite3.Connection) -> None:
+    """Migration v100: drop plain indexes duplicating UNIQUE column constraints."""
+    # payments.order_id and users.telegram_id are declared UNIQUE, so SQLite
+    # already keeps an autoindex on each; the extra copies only cost writes.
+    for table, column, index_name in (
+        ("payments", "order_id", "idx_payments_order_id"),
+        ("users", "telegram_id", "idx_users_telegram_id"),
+    ):
+        if _has_unique_index_on(conn, table, column):
+            conn.execute(f"DROP INDEX IF EXISTS {index_name}")
+    logger.info(
+        "Migration v100 applied: duplicate order_id and telegram_id indexes dropped"
+    )
+
+
 MIGRATIONS = {
     74: migration_74,
     75: migration_75,
@@ -4819,6 +4894,9 @@ MIGRATIONS = {
     95: migration_95,
     96: migration_96,
     97: migration_97,
+    98: migration_98,
+    99: migration_99,
+    100: migration_100,
 }
 
 
@@ -4886,6 +4964,9 @@ def run_migrations() -> None:
                     logger.info(f"🚀 Применяю миграцию v{version}...")
                     MIGRATIONS[version](conn)
                     set_version(conn, version)
+        invalidate_settings_cache()
+        invalidate_servers_cache()
+        invalidate_tariffs_cache()
 
         with get_db() as validation_conn:
             _assert_migration_database_integrity(
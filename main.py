@@ -12,7 +12,15 @@ import sys
 from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
 
+try:
+    import uvloop
+except ModuleNotFoundError as e:
+    if e.name != "uvloop":
+        raise
+    uvloop = None
+
 from config import BOT_TOKEN
+from database.connection import close_db_pool
 from database.migrations import run_migrations
 
 from bot.services.vpn_api import close_all_clients
@@ -56,51 +64,60 @@ async def on_startup(bot: Bot):
     """Actions when starting a bot."""
     logger.info("🚀 Бот запускается...")
     
-    # Applying database migrations
-    run_migrations()
+    # getMe is a Telegram round-trip that does not touch the database, so it
+    # runs while the migrations and startup caches are prepared.
+    bot_info_task = asyncio.create_task(bot.get_me())
+    try:
+        # Applying database migrations
+        await asyncio.to_thread(run_migrations)
 
-    from bot.utils.user_ui_texts import load_user_ui_text_cache
+        from bot.utils.user_ui_texts import load_user_ui_text_cache
 
-    loaded_ui_texts = load_user_ui_text_cache()
-    logger.info("User UI text cache loaded: %s entries", loaded_ui_texts)
+        loaded_ui_texts = load_user_ui_text_cache()
+        logger.info("User UI text cache loaded: %s entries", loaded_ui_texts)
 
-    from bot.utils.page_renderer import validate_required_user_pages
+        from bot.utils.page_renderer import validate_required_user_pages
 
-    required_pages = validate_required_user_pages()
-    logger.info("Required user pages validated: %s entries", required_pages)
+        required_pages = validate_required_user_pages()
+        logger.info("Required user pages validated: %s entries", required_pages)
 
-    from bot.utils.telegram_links import load_telegram_link_domain
+        from bot.utils.telegram_links import load_telegram_link_domain
 
-    load_telegram_link_domain()
+        load_telegram_link_domain()
 
-    from bot.utils.update_block import try_unblock
+        from bot.utils.update_block import try_unblock
 
-    try_unblock()
+        try_unblock()
 
-    from bot.services.yadreno_admin_core_guard import recover_core_guards_on_startup
+        from bot.services.yadreno_admin_core_guard import recover_core_guards_on_startup
 
-    await recover_core_guards_on_startup()
+        await recover_core_guards_on_startup()
 
-    from bot.utils.custom_extensions import load_custom_extensions
-    extensions_result = load_custom_extensions()
-    if extensions_result.skipped:
-        logger.info("Custom extensions не загружены: %s", extensions_result.reason)
-    else:
-        logger.info(
-            "Custom extensions: загружено %s, ошибок %s",
-            len(extensions_result.loaded),
-            len(extensions_result.failed),
-        )
+        from bot.utils.custom_extensions import load_custom_extensions
+        extensions_result = load_custom_extensions()
+        if extensions_result.skipped:
+            logger.info("Custom extensions не загружены: %s", extensions_result.reason)
+        else:
+            logger.info(
+                "Custom extensions: загружено %s, ошибок %s",
+                len(extensions_result.loaded),
+                len(extensions_result.failed),
+            )
 
-    try:
-        from bot.services.custom_payment_webhooks import start_custom_payment_webhook_server
+        try:
+            from bot.services.custom_payment_webhooks import start_custom_payment_webhook_server
+
+            bot.custom_payment_webhook_server = await start_custom_payment_webhook_server(bot)
+        except Exception as e:
+            logger.warning(f"Не удалось запустить custom payment webhook server: {e}")
+
+        # Bot information
+        bot_info = await bot_info_task
+    except BaseException:
+        bot_info_task.cancel()
+        await asyncio.gather(bot_info_task, return_exceptions=True)
+        raise
 
-        bot.custom_payment_webhook_server = await start_custom_payment_webhook_server(bot)
-    except Exception as e:
-        logger.warning(f"Не удалось запустить custom payment webhook server: {e}")
-    
-    # Bot information
-    bot_info = await bot.get_me()
     bot.my_username = bot_info.username
     logger.info(f"✅ Бот запущен: @{bot_info.username}")
 
@@ -187,10 +204,16 @@ async def on_shutdown(bot: Bot):
     """Actions to take when stopping the bot."""
     logger.info("🛑 Бот останавливается...")
 
+    # Schedulers still use the panel clients and the DB pool, so they are
+    # stopped before both are closed below.
+    background_tasks = getattr(bot, 'background_tasks', [])
     update_result_task = getattr(bot, 'pending_update_result_task', None)
-    if update_result_task is not None and not update_result_task.done():
-        update_result_task.cancel()
-        await asyncio.gather(update_result_task, return_exceptions=True)
+    if update_result_task is not None:
+        background_tasks = [*background_tasks, update_result_task]
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    bot.background_tasks = []
 
     webhook_server = getattr(bot, 'custom_payment_webhook_server', None)
     if webhook_server is not None:
@@ -201,6 +224,8 @@ async def on_shutdown(bot: Bot):
     
     # Close all VPN API sessions
     await close_all_clients()
+
+    close_db_pool()
     
     logger.info("✅ Бот остановлен")
 
@@ -257,17 +282,19 @@ async def main():
     try:
         await dp.start_polling(bot)
     finally:
-        background_tasks = getattr(bot, 'background_tasks', [])
-        for task in background_tasks:
-            task.cancel()
-        await asyncio.gather(*background_tasks, return_exceptions=True)
+        # on_shutdown does not run when on_startup fails
         await close_all_clients()
+        close_db_pool()
         await bot.session.close()
 
 
 if __name__ == "__main__":
     # Let's launch the bot
     try:
-        asyncio.run(main())
+        if uvloop is not None:
+            # libuv event loop: cheaper socket I/O for polling and panel API calls
+            uvloop.run(main())
+        else:
+            asyncio.run(main())
     except (KeyboardInterrupt, SystemExit):
         logger.info("Получен сигнал остановки")